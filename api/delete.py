@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from core.chroma import ChromaClient
+from core import get_chroma_client, get_semantic_cache
 from logger import get_logger
 
 logger = get_logger("delete")
@@ -14,18 +14,20 @@ async def delete_document(request: DeleteRequest):
     """
     Delete all document chunks for a given document ID from ChromaDB.
     """
-    logger.info(f"Received delete request for document_id: {request.document_id}")
+    logger.info("Received delete request for document_id: %s", request.document_id)
     try:
-        chroma = ChromaClient()
-        deleted = chroma.delete_document(request.document_id)
+        chroma = get_chroma_client()
+        deleted = await chroma.async_delete(request.document_id)
 
         if not deleted:
-            logger.warning(f"No document found with ID: {request.document_id}")
+            logger.warning("No document found with ID: %s", request.document_id)
             raise HTTPException(status_code=404, detail=f"No document found with ID: {request.document_id}")
 
-        logger.info(f"Successfully deleted all chunks for document ID: {request.document_id}")
+        get_semantic_cache().invalidate(request.document_id)
+
+        logger.info("Successfully deleted all chunks for document ID: %s", request.document_id)
         return {"message": f"Document '{request.document_id}' deleted successfully."}
 
     except Exception as e:
-        logger.error(f"Failed to delete document ID {request.document_id}: {e}", exc_info=True)
+        logger.error("Failed to delete document ID %s: %s", request.document_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to delete document: {e}")
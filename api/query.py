@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from schemas import QueryRequest, QueryResponse
+from core import get_embeddings, get_semantic_cache
 from core.retrieval import MultimodalRetriever
 from core.exceptions import RetrievalError, GenerationError
 from logger import get_logger
@@ -16,33 +17,39 @@ async def query_documents(request: QueryRequest, top_k: Optional[int] = 5) -> Qu
     Supports optional document_ids for focused querying, else runs full semantic match.
     """
 
-    logger.info(f"Received query: '{request.question}' | document_ids={request.document_ids} | top_k={top_k}")
-
-    if not request.question or not request.question.strip():
-        logger.warning("Query failed: Question is blank.")
-        raise HTTPException(status_code=400, detail="Please enter a non-empty question.")
+    logger.info("Received query: '%s' | document_ids=%s | top_k=%s", request.question, request.document_ids, top_k)
 
     try:
-        retriever = MultimodalRetriever(top_k=top_k)
-        corrected_query = await retriever.correct_query(request.question)
-
-        if corrected_query != request.question:
-            logger.info(f"Query corrected: {request.question} → {corrected_query}")
+        semantic_cache = get_semantic_cache()
+        scope = semantic_cache.scope_for(request.document_ids, top_k)
+        try:
+            question_embedding = await get_embeddings().aembed_query(request.question)
+        except Exception as e:
+            logger.error("Query embedding failed: %s", e, exc_info=True)
+            raise RetrievalError(f"Retrieval failed: {str(e)}")
+
+        cached = semantic_cache.get(scope, request.question, question_embedding)
+        if cached is not None:
+            logger.info("Query served from semantic cache.")
+            return cached
 
+        retriever = MultimodalRetriever(top_k=top_k)
         response = await retriever.end_to_end_query(
-            query=corrected_query,
-            document_ids=request.document_ids
+            query=request.question,
+            document_ids=request.document_ids,
+            query_embedding=question_embedding
         )
 
+        semantic_cache.put(scope, request.question, question_embedding, response)
         logger.info("Query completed successfully.")
         return response
 
     except RetrievalError as re:
-        logger.error(f"Retrieval failed: {re}")
+        logger.error("Retrieval failed: %s", re)
         raise HTTPException(status_code=404, detail=str(re))
 
     except GenerationError as ge:
-        logger.error(f"Answer generation failed: {ge}")
+        logger.error("Answer generation failed: %s", ge)
         raise HTTPException(status_code=500, detail=str(ge))
 
     except Exception as e:
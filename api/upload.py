@@ -1,12 +1,12 @@
 import os
-import tempfile
+import asyncio
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Optional, List
+from typing import BinaryIO, Optional, List, Tuple
 from schemas import DocumentMetadata
-from core.chroma import ChromaClient
+from core import get_chroma_client, get_semantic_cache
 from multimodel.processing import ProcessorFactory
 from core.exceptions import DocumentProcessingError
-from core.file_utils import compute_file_hash
+from core.file_utils import new_file_hasher
 from config import settings
 from logger import get_logger
 
@@ -14,72 +14,128 @@ logger = get_logger("upload")
 
 router = APIRouter()
 
-async def validate_file(file: UploadFile):
-    content = await file.read()
-    if len(content) > settings.MAX_FILE_SIZE:
-        raise HTTPException(413, detail=f"File too large: {file.filename}")
+UPLOAD_READ_SIZE = 1 << 20  # 1MB
+
+def _hash_upload(f: BinaryIO) -> Tuple[str, int]:
+    """Hash a file object from the start, stopping once it exceeds MAX_FILE_SIZE; rewinds it after"""
+    hasher = new_file_hasher()
+    size = 0
+    f.seek(0)
+    while chunk := f.read(UPLOAD_READ_SIZE):
+        size += len(chunk)
+        if size > settings.MAX_FILE_SIZE:
+            break
+        hasher.update(chunk)
+    f.seek(0)
+    return hasher.hexdigest(), size
 
+async def validate_file(file: UploadFile):
+    """
+    Check the extension, size and content hash of an upload.
+    Starlette has already spooled the body into file.file, so that buffer is
+    hashed in place and handed to the processors rather than copied again.
+    """
     ext = os.path.splitext(file.filename)[1].lower()
     if ext not in settings.allowed_file_types:
         raise HTTPException(415, detail=f"Unsupported file extension: {ext}")
 
-    await file.seek(0)
-    return ext, content
+    # Spooled uploads over 1MB live on disk, so read them off the event loop
+    file_hash, size = await asyncio.to_thread(_hash_upload, file.file)
+    if size > settings.MAX_FILE_SIZE:
+        raise HTTPException(413, detail=f"File too large: {file.filename}")
+
+    return ext, file.file, file_hash, size
+
+async def _process_one(chroma, file: UploadFile, ext: str, buffer: BinaryIO, file_hash: str) -> dict:
+    document_id = file.filename.replace(" ", "_") + "_" + file_hash[:8]
+    buffer.seek(0)
+
+    # Parsing and captioning are blocking; keep them off the event loop
+    processor = await asyncio.to_thread(ProcessorFactory.get_processor, buffer, ext)
+    chunks = await asyncio.to_thread(processor.process, buffer)
+
+    if not chunks:
+        raise HTTPException(422, detail=f"No content extracted from {file.filename}")
+
+    await chroma.async_add(chunks, document_id, file_hash=file_hash)
+    get_semantic_cache().invalidate(document_id)
+    logger.info("%s uploaded successfully → %s chunks.", file.filename, len(chunks))
+
+    return {
+        "document_id": document_id,
+        "file_hash": file_hash,
+        "status": "success",
+        "metadata": DocumentMetadata(
+            source=file.filename,
+            file_type=ext.lstrip("."),
+            pages=len(chunks)
+        ).model_dump()
+    }
 
 @router.post("/upload")
 async def upload_multiple_files(files: Optional[List[UploadFile]] = File(None)):
     if not files:
         raise HTTPException(400, detail="No files provided.")
 
-    logger.info(f"Uploading {len(files)} document(s)...")
-    chroma = ChromaClient()
-    responses = []
+    logger.info("Uploading %s document(s)...", len(files))
+    chroma = get_chroma_client()
+    # One result per file, in upload order, so clients can match them by position
+    responses: List[Optional[dict]] = [None] * len(files)
 
-    for file in files:
+    # Stream and hash every file first so duplicates are found in one Chroma lookup
+    staged = []
+    for index, file in enumerate(files):
         try:
-            ext, content = await validate_file(file)
-            file_hash = compute_file_hash(content)
-            document_id = file.filename.replace(" ", "_") + "_" + file_hash[:8]
-
-            if chroma.contains_file_hash(file_hash):
-                responses.append({
-                    "document_id": document_id,
-                    "status": "duplicate",
-                    "message": f"{file.filename} already uploaded."
-                })
-                continue
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(content)
-                file_path = tmp.name
-
-            processor = ProcessorFactory.get_processor(file_path)
-            chunks = processor.process()
-
-            if not chunks:
-                raise HTTPException(422, detail=f"No content extracted from {file.filename}")
-
-            chroma.add_documents(chunks, document_id, file_hash=file_hash)
-            logger.info(f"{file.filename} uploaded successfully → {len(chunks)} chunks.")
-
-            responses.append({
-                "document_id": document_id,
-                "file_hash": file_hash,
-                "status": "success",
-                "metadata": DocumentMetadata(
-                    source=file.filename,
-                    file_type=ext.lstrip("."),
-                    pages=len(chunks)
-                ).model_dump()
-            })
-
+            staged.append((index, file, *await validate_file(file)))
         except Exception as e:
-            logger.error(f"Failed to process {file.filename}: {e}")
-            responses.append({
+            logger.error("Failed to process %s: %s", file.filename, e)
+            responses[index] = {
                 "status": "error",
                 "filename": file.filename,
                 "message": str(e)
-            })
+            }
+
+    try:
+        existing_hashes = await chroma.async_existing_file_hashes([item[4] for item in staged])
+    except Exception:
+        for _, _, _, buffer, _, _ in staged:
+            buffer.close()
+        raise
+
+    pending = []
+    for index, file, ext, buffer, file_hash, size in staged:
+        if file_hash in existing_hashes:
+            buffer.close()
+            responses[index] = {
+                "document_id": file.filename.replace(" ", "_") + "_" + file_hash[:8],
+                "status": "duplicate",
+                "message": f"{file.filename} already uploaded."
+            }
+            continue
+        existing_hashes.add(file_hash)  # later copies in this batch are duplicates
+        pending.append((index, (file, ext, buffer, file_hash)))
+
+    sem = asyncio.Semaphore(min(settings.UPLOAD_CONCURRENCY, len(pending)) or 1)
+
+    async def _bounded(item):
+        _, _, buffer, _ = item
+        try:
+            async with sem:
+                return await _process_one(chroma, *item)
+        finally:
+            buffer.close()
 
-    return {"results": responses}
+    results = await asyncio.gather(*[_bounded(item) for _, item in pending], return_exceptions=True)
 
+    for (index, (file, *_)), result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to process %s: %s", file.filename, result)
+            responses[index] = {
+                "status": "error",
+                "filename": file.filename,
+                "message": str(result)
+            }
+        else:
+            responses[index] = result
+
+    return {"results": responses}
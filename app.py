@@ -0,0 +1,56 @@
+import logging
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from core import initialize_services, shutdown_services
+from core.exceptions import global_exception_handler, validation_exception_handler
+from multimodel.processing import ProcessorFactory
+from api import upload, query, delete
+
+# Setup logger
+logger = logging.getLogger("multimodal_api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting up Multimodal Document Assistant API...")
+    try:
+        initialize_services()
+        ProcessorFactory.warm_up()
+        logger.info("Services initialized successfully.")
+        yield
+    finally:
+        logger.info("Cleaning up resources before shutdown.")
+        ProcessorFactory.shutdown()
+        shutdown_services()
+
+
+app = FastAPI(
+    title="Multimodal Document Assistant API",
+    description="API for processing documents with text, tables and images",
+    version="1.0.0",
+    docs_url=None,  # Disable Swagger UI
+    redoc_url=None,  # Disable Redoc
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.add_exception_handler(Exception, global_exception_handler)
+app.add_exception_handler(RequestValidationError, validation_exception_handler)
+
+app.include_router(upload.router, prefix="/v1")
+app.include_router(query.router, prefix="/v1")
+app.include_router(delete.router, prefix="/v1")
+
+
+@app.get("/health")
+async def health():
+    logger.info("Health check requested.")
+    return {"status": "ready", "services": ["chroma", "gemini"]}
+
@@ -1,22 +1,45 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Optional, FrozenSet
 
 class Settings(BaseSettings):
     # Gemini Configuration
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-1.5-flash"
     EMBEDDING_MODEL: str = "models/embedding-001"
+    EMBEDDING_CACHE_SIZE: int = 2_000  # cached chunk embeddings (float16, ~1.7KB each)
 
     # ChromaDB Configuration
     CHROMA_PATH: str = "./chroma_db"
     CHROMA_COLLECTION: str = "multimodal_docs"
+    # Set CHROMA_HOST to use a Chroma server instead of the local CHROMA_PATH store.
+    # The per-process semantic answer cache below is turned off in that mode.
+    CHROMA_HOST: Optional[str] = None
+    CHROMA_PORT: int = 8001
+    CHROMA_SERVER_CONCURRENCY: int = 8
+
+    # Query Correction Cache (normalized question -> corrected question)
+    QUERY_CACHE_SIZE: int = 1024
+    QUERY_CACHE_TTL: int = 3600  # seconds
+
+    # Semantic Query Cache
+    SEMANTIC_CACHE_SIZE: int = 1000
+    SEMANTIC_CACHE_TTL: int = 3600  # seconds
+    # A hit returns another question's stored answer unchecked. Lower values hit
+    # more often but risk answering a differently worded or different entity
+    # question; hits also require the same numbers in both questions.
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
 
     # Allowed File Types
-    allowed_file_types: List[str] = [".pdf", ".docx"]
+    allowed_file_types: FrozenSet[str] = frozenset({".pdf", ".docx"})  # O(1) membership on upload
 
     # Processing Limits
     MAX_FILE_SIZE: int = 10_000_000  # 10MB
+    UPLOAD_CONCURRENCY: int = 4  # files parsed and embedded in parallel per upload request
     MAX_IMAGE_DIMENSION: int = 2048
+    CAPTION_CONCURRENCY: int = 8  # Gemini caption requests in flight across all uploads
+    CAPTION_CACHE_SIZE: int = 4096  # captions kept by image content hash
+    MIN_CAPTION_IMAGE_AREA: int = 64 * 64  # smaller images (icons, rules, spacers) aren't captioned
+    PDF_PARSE_WORKERS: int = 4  # processes for text/table extraction on large PDFs
 
     # API Server Configuration
     API_HOST: str = "127.0.0.1"
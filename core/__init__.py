@@ -1,5 +1,6 @@
 from .chroma import ChromaClient
 from .embeddings import GeminiEmbeddings
+from .semantic_cache import SemanticCache
 from .exceptions import (
     DocumentProcessingError,
     RetrievalError,
@@ -14,10 +15,11 @@ logger = logging.getLogger(__name__)
 # Service instances with lazy initialization
 _chroma_client: Optional[ChromaClient] = None
 _embeddings: Optional[GeminiEmbeddings] = None
+_semantic_cache: Optional[SemanticCache] = None
 
 def initialize_services():
     """Initialize all core services"""
-    global _chroma_client, _embeddings
+    global _chroma_client, _embeddings, _semantic_cache
     
     try:
         logger.info("Initializing ChromaDB client...")
@@ -25,12 +27,23 @@ def initialize_services():
         
         logger.info("Initializing Gemini embeddings...")
         _embeddings = GeminiEmbeddings()
+
+        logger.info("Initializing semantic query cache...")
+        _semantic_cache = SemanticCache()
         
         logger.info("Core services initialized")
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         raise
 
+def shutdown_services():
+    """Stop the worker threads behind Chroma calls, embedding fallbacks and captioning"""
+    from . import captioner, chroma, embeddings
+
+    for module in (chroma, embeddings, captioner):
+        module.shutdown_pool()
+    logger.info("Core worker pools shut down")
+
 def get_chroma_client() -> ChromaClient:
     """Get the initialized ChromaDB client instance"""
     if _chroma_client is None:
@@ -43,14 +56,23 @@ def get_embeddings() -> GeminiEmbeddings:
         raise RuntimeError("Embeddings not initialized. Call initialize_services() first.")
     return _embeddings
 
+def get_semantic_cache() -> SemanticCache:
+    """Get the initialized semantic query cache"""
+    if _semantic_cache is None:
+        raise RuntimeError("Semantic cache not initialized. Call initialize_services() first.")
+    return _semantic_cache
+
 # Public API
 __all__ = [
     'ChromaClient',
     'GeminiEmbeddings',
+    'SemanticCache',
     'DocumentProcessingError',
     'RetrievalError',
     'GenerationError',
     'initialize_services',
+    'shutdown_services',
     'get_chroma_client',
-    'get_embeddings'
+    'get_embeddings',
+    'get_semantic_cache'
 ]
\ No newline at end of file
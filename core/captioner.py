@@ -1,5 +1,10 @@
+import json
+import hashlib
+import threading
 import google.generativeai as genai
-from typing import Union, Dict, Any
+from cachetools import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Dict, Any, List, Optional
 from PIL import Image
 import io
 from config import settings
@@ -8,6 +13,40 @@ from logger import get_logger
 
 logger = get_logger("GeminiMultimodalProcessor")
 
+# Captioning is one network round trip per item; shared so concurrent uploads
+# together stay within CAPTION_CONCURRENCY requests
+_caption_pool = ThreadPoolExecutor(max_workers=settings.CAPTION_CONCURRENCY, thread_name_prefix="caption")
+# Images described per request; amortizes per-call overhead without making
+# one slow or failed response cost too many captions
+CAPTION_BATCH_SIZE = 8
+
+# Content digest -> caption, so logos and images repeated across pages or
+# re-uploaded documents are captioned once per process
+_caption_cache: "LRUCache[bytes, str]" = LRUCache(maxsize=settings.CAPTION_CACHE_SIZE)
+_caption_cache_lock = threading.Lock()
+
+# Leading magic bytes of the image formats Gemini accepts as-is; these are sent
+# without decoding, anything else goes through PIL for conversion
+_INLINE_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+)
+
+
+def _image_part(image_bytes: bytes) -> Union[Dict[str, Any], Image.Image]:
+    """Content part for one image: the original bytes when Gemini accepts the format"""
+    for signature, mime_type in _INLINE_IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return {"mime_type": mime_type, "data": image_bytes}
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return {"mime_type": "image/webp", "data": image_bytes}
+    return Image.open(io.BytesIO(image_bytes))
+
+
+def shutdown_pool():
+    """Stop the caption request threads; called at app shutdown"""
+    _caption_pool.shutdown(wait=True, cancel_futures=True)
+
 
 class GeminiMultimodalProcessor:
     """
@@ -34,6 +73,11 @@ class GeminiMultimodalProcessor:
             "Analyze the following table and describe its structure, purpose, and key data trends:\n\n"
             "{table_data}"
         )
+        self.image_batch_prompt = (
+            "Describe each of the following {count} images thoroughly so it can be understood in a text-only context.\n"
+            "Mention: main objects, layout, purpose, any visible text or numbers.\n"
+            "Return a JSON array of exactly {count} strings: one description per image, in the order given."
+        )
         logger.debug("Captioner prompts configured.")
 
     def process_image(self, image_bytes: bytes) -> str:
@@ -43,20 +87,34 @@ class GeminiMultimodalProcessor:
         """
         try:
             logger.info("Processing image to generate caption...")
-            img = Image.open(io.BytesIO(image_bytes))
-            logger.debug(f"Image loaded: format={img.format}, size={img.size}")
-
             response = self.model.generate_content(
-                contents=self.image_prompt[:-1] + [img]
+                contents=self.image_prompt[:-1] + [_image_part(image_bytes)]
             )
             caption = response.text.strip()
             logger.info("Image captioning complete.")
             return caption
 
         except Exception as e:
-            logger.error(f"Image captioning failed: {str(e)}", exc_info=True)
+            logger.error("Image captioning failed: %s", e, exc_info=True)
             raise DocumentProcessingError(f"Image captioning failed: {str(e)}")
 
+    def process_image_batch(self, images: List[bytes]) -> List[str]:
+        """
+        Caption several images with one request.
+        Raises if the response is not one description per image.
+        """
+        logger.info("Captioning batch of %s images...", len(images))
+        contents = [self.image_batch_prompt.format(count=len(images))]
+        contents.extend(_image_part(image_bytes) for image_bytes in images)
+        response = self.model.generate_content(
+            contents=contents,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        captions = json.loads(response.text)
+        if not isinstance(captions, list) or len(captions) != len(images):
+            raise DocumentProcessingError(f"Expected {len(images)} captions, got: {response.text[:100]}")
+        return [str(caption).strip() for caption in captions]
+
     def process_table(self, table_data: Union[Dict[str, Any], str]) -> str:
         """
         Generate a textual description for a table.
@@ -76,7 +134,7 @@ class GeminiMultimodalProcessor:
             return description
 
         except Exception as e:
-            logger.error(f"Table description failed: {str(e)}", exc_info=True)
+            logger.error("Table description failed: %s", e, exc_info=True)
             raise DocumentProcessingError(f"Table description failed: {str(e)}")
 
     def process(self, content: bytes, content_type: str) -> str:
@@ -84,12 +142,63 @@ class GeminiMultimodalProcessor:
         Unified processor for both image and table content.
         Returns caption/description in plain text.
         """
-        logger.info(f"Running Gemini processor for type: {content_type}")
+        logger.info("Running Gemini processor for type: %s", content_type)
         if content_type == "image":
             return self.process_image(content)
         elif content_type == "table":
             return self.process_table(content)
         else:
-            logger.error(f"Unsupported content type: {content_type}")
+            logger.error("Unsupported content type: %s", content_type)
             raise DocumentProcessingError(f"Unsupported content type: {content_type}")
 
+    def _safe_process(self, content: bytes, content_type: str) -> Optional[str]:
+        try:
+            return self.process(content, content_type)
+        except Exception as e:
+            logger.warning("Skipping %s that failed captioning: %s", content_type, e)
+            return None
+
+    def _caption_image_group(self, images: List[bytes]) -> List[Optional[str]]:
+        if len(images) > 1:
+            try:
+                return self.process_image_batch(images)
+            except Exception as e:
+                logger.warning("Batch captioning failed, falling back to per-image: %s", e)
+        return [self._safe_process(image, 'image') for image in images]
+
+    @staticmethod
+    def _cache_key(content: Union[bytes, str], content_type: str) -> bytes:
+        data = content.encode() if isinstance(content, str) else content
+        return hashlib.blake2b(data, digest_size=16, person=content_type.encode()).digest()
+
+    def process_many(self, contents: List[bytes], content_type: str) -> List[Optional[str]]:
+        """
+        Caption several items concurrently; images are sent CAPTION_BATCH_SIZE per request.
+        Identical items are captioned once, and previously seen ones come from the cache.
+        Returns captions in input order, with None for items that failed.
+        """
+        keys = [self._cache_key(c, content_type) for c in contents]
+        with _caption_cache_lock:
+            captions = [_caption_cache.get(k) for k in keys]
+
+        missing: Dict[bytes, List[int]] = {}
+        for i, (key, caption) in enumerate(zip(keys, captions)):
+            if caption is None:
+                missing.setdefault(key, []).append(i)
+        if len(missing) < len(contents):
+            logger.info("Caption cache/duplicate hits: %s/%s", len(contents) - len(missing), len(contents))
+
+        todo = [contents[indices[0]] for indices in missing.values()]
+        if content_type == "image":
+            groups = [todo[i:i + CAPTION_BATCH_SIZE] for i in range(0, len(todo), CAPTION_BATCH_SIZE)]
+            new_captions = [c for group in _caption_pool.map(self._caption_image_group, groups) for c in group]
+        else:
+            new_captions = list(_caption_pool.map(lambda c: self._safe_process(c, content_type), todo))
+
+        for (key, indices), caption in zip(missing.items(), new_captions):
+            for i in indices:
+                captions[i] = caption
+            if caption is not None:  # failures are retried next time
+                with _caption_cache_lock:
+                    _caption_cache[key] = caption
+        return captions
@@ -1,75 +1,200 @@
+import asyncio
+import functools
+import itertools
 import chromadb
-from typing import List, Dict, Optional
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
 from schemas import DocumentChunk
 from logger import get_logger
-from core.embeddings import GeminiEmbeddings
+from core.embeddings import GeminiEmbeddings, BATCH_SIZE as EMBED_BATCH_SIZE
+from core.text_utils import MAX_CHUNK_LENGTH, split_text
 from config import settings
 
 logger = get_logger("ChromaClient")
 
-MAX_CHUNK_LENGTH = 30000
+# Keeps SQLite below its bound-variable limit; a multiple of the embedding
+# BATCH_SIZE so each pipelined write batch maps to whole embedding requests
+WRITE_BATCH_SIZE = 2 * EMBED_BATCH_SIZE
+
+# Embeddings are stored unit-length, so inner product is cosine similarity
+# without HNSW renormalizing on every comparison; score = 1 - distance either way.
+# Only applies when a collection is created; existing collections keep their space.
+COLLECTION_METADATA = {"hnsw:space": "ip"}
+
+# Clients and collections are shared per (store, collection_name) so repeated
+# ChromaClient() construction does not reopen the store. The store is the
+# local CHROMA_PATH, or host:port when a Chroma server is configured.
+_clients: Dict[str, object] = {}
+_collections: Dict[Tuple[str, str], Tuple[GeminiEmbeddings, object]] = {}
+# File hashes known to be stored, loaded lazily per collection on first duplicate check.
+# Local store only: with a Chroma server, other API workers add and delete
+# documents too, so duplicates are checked against the server every time.
+_known_hashes: Dict[Tuple[str, str], Set[str]] = {}
+
+# The local Chroma client is not thread-safe, so async callers share one worker
+# thread. A Chroma server handles its own locking, so requests can overlap.
+_chroma_pool = ThreadPoolExecutor(
+    max_workers=settings.CHROMA_SERVER_CONCURRENCY if settings.CHROMA_HOST else 1,
+    thread_name_prefix="chroma"
+)
+
+def shutdown_pool():
+    """Stop the Chroma worker threads; called at app shutdown"""
+    _chroma_pool.shutdown(wait=True, cancel_futures=True)
+
+def _store_key() -> str:
+    if settings.CHROMA_HOST:
+        return f"{settings.CHROMA_HOST}:{settings.CHROMA_PORT}"
+    return settings.CHROMA_PATH
+
+def _make_client():
+    if settings.CHROMA_HOST:
+        logger.info("Connecting to Chroma server at %s:%s", settings.CHROMA_HOST, settings.CHROMA_PORT)
+        return chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
+    return chromadb.PersistentClient(path=settings.CHROMA_PATH)
 
 class ChromaClient:
     def __init__(self, collection_name: str = settings.CHROMA_COLLECTION):
-        logger.info(f"Initializing ChromaClient with collection: {collection_name}")
-        self.client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
-        self.embedding_fn = GeminiEmbeddings()
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            embedding_function=self.embedding_fn
-        )
+        logger.info("Initializing ChromaClient with collection: %s", collection_name)
+        store = _store_key()
+        if store not in _clients:
+            _clients[store] = _make_client()
+        self.client = _clients[store]
+
+        key = self._key = (store, collection_name)
+        if key not in _collections:
+            embedding_fn = GeminiEmbeddings()
+            collection = self.client.get_or_create_collection(
+                name=collection_name,
+                embedding_function=embedding_fn,
+                metadata=COLLECTION_METADATA
+            )
+            _collections[key] = (embedding_fn, collection)
+        self.embedding_fn, self.collection = _collections[key]
 
-    def split_large_chunks(self, chunks: List[DocumentChunk], max_len: int = MAX_CHUNK_LENGTH) -> List[DocumentChunk]:
-        new_chunks = []
+    @staticmethod
+    def _iter_split_chunks(chunks: Iterable[DocumentChunk], max_len: int = MAX_CHUNK_LENGTH) -> Iterator[DocumentChunk]:
         for chunk in chunks:
             content = chunk.content
-            if len(content) > max_len:
-                parts = [content[i:i+max_len] for i in range(0, len(content), max_len)]
-                for idx, part in enumerate(parts):
-                    new_chunks.append(DocumentChunk(
-                        content=part,
-                        type="text",
-                        page_number=chunk.page_number,
-                        doc_id=chunk.doc_id
-                    ))
-            else:
-                new_chunks.append(chunk)
-        return new_chunks
-
-    def contains_file_hash(self, file_hash: str) -> bool:
-        logger.debug(f"Checking for existing file hash: {file_hash}")
-        results = self.collection.get(where={"file_hash": file_hash}, limit=1)
-        return len(results["ids"]) > 0
-
-    def add_documents(self, chunks: List[DocumentChunk], document_id: str, file_hash: Optional[str] = None):
-        logger.info(f"Adding {len(chunks)} chunks for document_id={document_id}")
-        try:
-            chunks = self.split_large_chunks(chunks)
-            ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-            documents = [c.content for c in chunks]
-            embeddings = self.embedding_fn.embed_documents(documents)
-
-            metadatas = []
-            for chunk in chunks:
-                metadata = {
-                    "type": "text",
-                    "page": chunk.page_number if chunk.page_number is not None else -1,
-                    "doc_id": document_id,
-                }
-                if file_hash:
-                    metadata["file_hash"] = file_hash
-                metadatas.append(metadata)
-
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                embeddings=embeddings,
-                metadatas=metadatas
+            if len(content) <= max_len:
+                yield chunk
+                continue
+            # Fields are copied from an already-validated chunk, so skip re-validation
+            for part in split_text(content, max_len):
+                yield DocumentChunk.model_construct(
+                    content=part,
+                    type="text",
+                    page_number=chunk.page_number,
+                    doc_id=chunk.doc_id
+                )
+
+    def _get_known_hashes(self) -> Set[str]:
+        known = _known_hashes.get(self._key)
+        if known is None:
+            logger.info("Loading stored file hashes from ChromaDB")
+            results = self.collection.get(include=["metadatas"])
+            known = _known_hashes[self._key] = {
+                meta["file_hash"] for meta in results["metadatas"] if meta and meta.get("file_hash")
+            }
+        return known
+
+    def existing_file_hashes(self, file_hashes: List[str]) -> Set[str]:
+        """Return the subset of file_hashes already stored."""
+        logger.debug("Checking %s file hashes for existing uploads", len(file_hashes))
+        if not file_hashes:
+            return set()
+        if settings.CHROMA_HOST:
+            results = self.collection.get(
+                where={"file_hash": {"$in": list(file_hashes)}},
+                include=["metadatas"]
             )
+            return {meta["file_hash"] for meta in results["metadatas"] if meta and meta.get("file_hash")}
+        return self._get_known_hashes().intersection(file_hashes)
+
+    def _iter_record_batches(self, chunks: Iterable[DocumentChunk], document_id: str, file_hash: Optional[str]):
+        """
+        Yield (ids, documents, metadatas) for WRITE_BATCH_SIZE chunks at a time,
+        so only one batch of records and embeddings is held in memory.
+        """
+        base_metadata = {"type": "text", "doc_id": document_id}
+        if file_hash:
+            base_metadata["file_hash"] = file_hash
+
+        split_chunks = self._iter_split_chunks(chunks)
+        offset = 0
+        while batch := list(itertools.islice(split_chunks, WRITE_BATCH_SIZE)):
+            ids = [f"{document_id}_chunk_{i}" for i in range(offset, offset + len(batch))]
+            documents = [c.content for c in batch]
+            metadatas = [
+                {**base_metadata, "page": chunk.page_number if chunk.page_number is not None else -1}
+                for chunk in batch
+            ]
+            offset += len(batch)
+            yield ids, documents, metadatas
+
+    def _record_file_hash(self, file_hash: Optional[str]):
+        if file_hash and not settings.CHROMA_HOST:
+            self._get_known_hashes().add(file_hash)
+
+    def _discard_partial_document(self, document_id: str):
+        """Remove batches a failed add already wrote, so their file_hash doesn't mark the file as stored"""
+        try:
+            self.collection.delete(where={"doc_id": document_id})
+        except Exception as e:
+            logger.error("Failed to remove partial chunks for document_id=%s: %s", document_id, e)
+
+    async def add_documents_async(self, chunks: List[DocumentChunk], document_id: str, file_hash: Optional[str] = None):
+        """
+        Embed and store chunks, pipelined: embeds batch i+1 (network-bound) while
+        batch i is written to Chroma, so ingest time tends toward the
+        slower of the two stages rather than their sum.
+        """
+        logger.info("Adding %s chunks for document_id=%s (pipelined)", len(chunks), document_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        done = object()
+
+        async def produce():
+            try:
+                for ids, documents, metadatas in self._iter_record_batches(chunks, document_id, file_hash):
+                    # One float32 matrix per batch, the dtype Chroma stores anyway
+                    embeddings = await asyncio.to_thread(
+                        self.embedding_fn.embed_documents_batched, documents
+                    )
+                    await queue.put({
+                        "ids": ids,
+                        "documents": documents,
+                        "embeddings": embeddings,
+                        "metadatas": metadatas,
+                    })
+            except asyncio.CancelledError:
+                raise  # consume() has stopped, so nothing would take the sentinel
+            except Exception:
+                await queue.put(done)  # let consume() finish; `await producer` re-raises
+                raise
+            await queue.put(done)
+
+        async def consume():
+            while (batch := await queue.get()) is not done:
+                await self._run_in_pool(self.collection.add, **batch)
+
+        try:
+            producer = asyncio.create_task(produce())
+            try:
+                await consume()
+                await producer
+            except BaseException:
+                # The producer may be blocked on the full queue; cancel it and
+                # wait for it to finish so the task isn't left pending
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+                raise
+            await self._run_in_pool(self._record_file_hash, file_hash)
             logger.info("Chunks successfully added to ChromaDB.")
 
         except Exception as e:
-            logger.error(f"Failed to add documents to ChromaDB: {e}", exc_info=True)
+            logger.error("Failed to add documents to ChromaDB: %s", e, exc_info=True)
+            await self._run_in_pool(self._discard_partial_document, document_id)
             raise
 
     def retrieve_relevant_documents(self, query_embedding: List[float], top_k: int = 3) -> List[str]:
@@ -78,12 +203,11 @@ class ChromaClient:
             query_embeddings=[query_embedding],
             n_results=top_k
         )
-        doc_ids = []
-        for meta in results["metadatas"][0]:
-            doc_id = meta.get("doc_id")
-            if doc_id and doc_id not in doc_ids:
-                doc_ids.append(doc_id)
-        logger.debug(f"Relevant documents found: {doc_ids}")
+        # dict preserves first-seen order, so this dedupes in a single pass
+        doc_ids = list(dict.fromkeys(
+            meta["doc_id"] for meta in results["metadatas"][0] if meta.get("doc_id")
+        ))
+        logger.debug("Relevant documents found: %s", doc_ids)
         return doc_ids
 
     def query(
@@ -93,21 +217,26 @@ class ChromaClient:
     document_id: Optional[str] = None,
     filter_types: Optional[List[str]] = None,
     n_results: int = 5,
+    document_ids: Optional[List[str]] = None,
 ) -> List[Dict]:
             
-        filters = {}
+        conditions = []
 
         if document_id:
-            filters["doc_id"] = document_id
+            conditions.append({"doc_id": document_id})
+        if document_ids:
+            conditions.append({"doc_id": {"$in": list(document_ids)}})
         if filter_types:
-            filters["type"] = {"$in": filter_types}
+            conditions.append({"type": {"$in": filter_types}})
 
         query_args = {
             "n_results": n_results
         }
 
-        # ONLY add "where" if filters is not empty
-        if filters:
+        # ONLY add "where" if there are filters; Chroma needs $and to combine several
+        filters = None
+        if conditions:
+            filters = conditions[0] if len(conditions) == 1 else {"$and": conditions}
             query_args["where"] = filters
 
         if query_text:
@@ -117,42 +246,58 @@ class ChromaClient:
         else:
             raise ValueError("Either query_text or query_embedding must be provided.")
 
-        logger.info(f"ChromaDB query: filters={filters if filters else 'None'}, top_k={n_results}")
+        logger.info("ChromaDB query: filters=%s, top_k=%s", filters if filters else 'None', n_results)
         
         results = self.collection.query(**query_args)
 
+        ids, docs, metas, dists = (
+            results["ids"][0],
+            results["documents"][0],
+            results["metadatas"][0],
+            results["distances"][0]
+        )
+        scores = (1.0 - np.asarray(dists, dtype=np.float64)).tolist()
         return [
-            {
-                "id": id_,
-                "document": doc,
-                "metadata": meta,
-                "score": 1 - dist
-            }
-            for id_, doc, meta, dist in zip(
-                results["ids"][0],
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )
+            {"id": id_, "document": doc, "metadata": meta, "score": score}
+            for id_, doc, meta, score in zip(ids, docs, metas, scores)
         ]
 
     def delete_document(self, document_id: str) -> bool:
-        logger.info(f"Deleting chunks for document_id={document_id}")
+        logger.info("Deleting chunks for document_id=%s", document_id)
         try:
-            result = self.collection.query(
-                where={"doc_id": document_id},
-                n_results=1000,
-                include=["ids"]
-            )
-            ids = result.get("ids", [[]])[0]
-            if not ids:
+            # Every chunk of a document carries the same metadata, so one probe is
+            # enough to tell whether it exists and which file hash it owned
+            probe = self.collection.get(where={"doc_id": document_id}, limit=1, include=["metadatas"])
+            if not probe.get("ids"):
                 logger.warning("No chunks found for deletion.")
                 return False
 
-            self.collection.delete(ids=ids)
-            logger.info(f"Deleted {len(ids)} chunks.")
+            self.collection.delete(where={"doc_id": document_id})
+
+            if not settings.CHROMA_HOST:
+                known = self._get_known_hashes()
+                for meta in probe.get("metadatas") or []:
+                    if meta and meta.get("file_hash"):
+                        known.discard(meta["file_hash"])
+            logger.info("Deleted all chunks for document_id=%s", document_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to delete document: {e}", exc_info=True)
+            logger.error("Failed to delete document: %s", e, exc_info=True)
             raise
+
+    async def _run_in_pool(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_chroma_pool, functools.partial(fn, *args, **kwargs))
+
+    async def async_query(self, **kwargs) -> List[Dict]:
+        return await self._run_in_pool(self.query, **kwargs)
+
+    async def async_add(self, chunks: List[DocumentChunk], document_id: str, file_hash: Optional[str] = None):
+        return await self.add_documents_async(chunks, document_id, file_hash=file_hash)
+
+    async def async_existing_file_hashes(self, file_hashes: List[str]) -> Set[str]:
+        return await self._run_in_pool(self.existing_file_hashes, file_hashes)
+
+    async def async_delete(self, document_id: str) -> bool:
+        return await self._run_in_pool(self.delete_document, document_id)
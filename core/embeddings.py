@@ -1,12 +1,72 @@
+import hashlib
+import threading
+import numpy as np
 import google.generativeai as genai
-from typing import List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from config import settings
+from core.text_utils import MAX_CHUNK_LENGTH, split_text
 from logger import get_logger
 
 logger = get_logger("GeminiEmbeddings")
 
-MAX_CHUNK_LENGTH = 30000  
-BATCH_SIZE = 5             
+BATCH_SIZE = 100           # Gemini batchEmbedContents limit
+FALLBACK_CONCURRENCY = 32  # per-text requests in flight when a batch fails
+EMBEDDING_DIM = 768
+
+_embed_pool = ThreadPoolExecutor(max_workers=FALLBACK_CONCURRENCY, thread_name_prefix="embed")
+
+
+def shutdown_pool():
+    """Stop the per-text fallback threads; called at app shutdown"""
+    _embed_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _l2_normalize(vectors: List[List[float]]) -> np.ndarray:
+    """
+    Scale vectors to unit length so inner product equals cosine similarity,
+    as one float32 matrix. Zero vectors (the failure fallback) are left as-is.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class _EmbeddingCache:
+    """
+    Thread-safe LRU of text digest -> embedding.
+    Vectors are stored as float16 to halve the cache's memory footprint.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                return None
+            self._entries.move_to_end(key)
+        return vec
+
+    def put(self, key: bytes, embedding: np.ndarray):
+        vec = embedding.astype(np.float16)
+        with self._lock:
+            self._entries[key] = vec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache = _EmbeddingCache(settings.EMBEDDING_CACHE_SIZE)
 
 class GeminiEmbeddings:
     def __init__(self):
@@ -15,59 +75,117 @@ class GeminiEmbeddings:
         self.model_name = 'models/embedding-001'
         logger.info("Gemini embeddings model initialized")
 
-    def __call__(self, input: List[str]) -> List[List[float]]:
-        return self.embed_documents(input)
-
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        logger.info(f"Embedding total of {len(texts)} documents")
-        embeddings = []
-        batch = []
-
-        def safe_embed(text_batch):
-            batch_embeddings = []
-            for text in text_batch:
-                try:
-                    emb = self.embed_query(text)
-                    logger.info(f"Generated embedding dimension: {len(emb)}")
-                    batch_embeddings.append(emb)
-                except Exception as e:
-                    logger.error(f"Failed to embed text: {text[:30]}... Error: {e}")
-                    batch_embeddings.append([0.0] * 768)  # fallback embedding
-            return batch_embeddings
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return list(self.embed_documents(input))
 
+    def _split_texts(self, texts: List[str]) -> List[str]:
+        parts = []
         for text in texts:
             if len(text) > MAX_CHUNK_LENGTH:
-                logger.warning(f"Splitting oversized text chunk of length {len(text)}")
-                parts = [text[i:i+MAX_CHUNK_LENGTH] for i in range(0, len(text), MAX_CHUNK_LENGTH)]
-                for part in parts:
-                    batch.append(part)
-                    if len(batch) == BATCH_SIZE:
-                        embeddings.extend(safe_embed(batch))
-                        batch = []
+                logger.warning("Splitting oversized text chunk of length %s", len(text))
+                parts.extend(split_text(text))
             else:
-                batch.append(text)
-                if len(batch) == BATCH_SIZE:
-                    embeddings.extend(safe_embed(batch))
-                    batch = []
+                parts.append(text)
+        return parts
 
-        if batch:
-            embeddings.extend(safe_embed(batch))
+    def _safe_embed(self, text: str) -> List[float]:
+        try:
+            emb = self.embed_query(text)
+            logger.debug("Generated embedding dimension: %s", len(emb))
+            return emb
+        except Exception as e:
+            logger.error("Failed to embed text: %s... Error: %s", text[:30], e)
+            return [0.0] * EMBEDDING_DIM  # fallback embedding
 
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        logger.info("Embedding total of %s documents", len(texts))
+        embeddings = self.embed_documents_batched(self._split_texts(texts))
         logger.info("Completed embedding of all batches")
         return embeddings
 
+    def _partition_cached(self, texts: List[str]) -> Tuple[np.ndarray, Dict[bytes, List[int]]]:
+        """
+        Look texts up in the cache. Returns the embedding matrix with cached
+        rows filled in, and the uncached texts grouped by key, so a text
+        repeated within the batch is sent to the API once.
+        """
+        embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        missing: Dict[bytes, List[int]] = {}
+        for i, text in enumerate(texts):
+            key = _cache.key(text)
+            emb = _cache.get(key)
+            if emb is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                embeddings[i] = emb
+        misses = sum(len(indices) for indices in missing.values())
+        if misses < len(texts):
+            logger.info("Embedding cache hits: %s/%s", len(texts) - misses, len(texts))
+        if len(missing) < misses:
+            logger.info("Deduplicated %s repeated texts in batch", misses - len(missing))
+        return embeddings, missing
+
+    @staticmethod
+    def _fill_missing(embeddings: np.ndarray, missing: Dict[bytes, List[int]], new_embeddings: np.ndarray) -> np.ndarray:
+        for (key, indices), emb in zip(missing.items(), new_embeddings):
+            embeddings[indices] = emb
+            if emb.any():  # don't cache the zero-vector failure fallback
+                _cache.put(key, emb)
+        return embeddings
+
+    def embed_documents_batched(self, texts: List[str], batch_size: int = BATCH_SIZE) -> np.ndarray:
+        """
+        Embed texts into one float32 matrix, serving repeats from the
+        content-hash cache and sending each remaining distinct text once, as
+        one batchEmbedContents request per group of batch_size.
+        Texts are expected to already fit within MAX_CHUNK_LENGTH.
+        """
+        embeddings, missing = self._partition_cached(texts)
+        if missing:
+            new_embeddings = self._embed_batches([texts[idx[0]] for idx in missing.values()], batch_size)
+            self._fill_missing(embeddings, missing, new_embeddings)
+        return embeddings
+
+    def _embed_batches(self, texts: List[str], batch_size: int) -> np.ndarray:
+        logger.info("Batch embedding %s documents (batch_size=%s)", len(texts), batch_size)
+        embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            group = texts[start:start + batch_size]
+            try:
+                result = genai.embed_content(
+                    model=self.model_name,
+                    content=group,
+                    task_type="retrieval_document"
+                )
+                embeddings[start:start + len(group)] = _l2_normalize(result["embedding"])
+            except Exception as e:
+                # Only fall back to per-text requests when the whole batch fails
+                logger.warning("Batch embedding failed, falling back to per-text: %s", e)
+                embeddings[start:start + len(group)] = list(_embed_pool.map(self._safe_embed, group))
+        logger.info("Completed batch embedding")
+        return embeddings
+
     def embed_query(self, text: str) -> List[float]:
-        logger.debug(f"Embedding single query text: {text[:30]}...")
+        logger.debug("Embedding single query text: %s...", text[:30])
         result = genai.embed_content(
             model=self.model_name,
             content=text,
             task_type="retrieval_document"
         )
-        embedding = result["embedding"]
+        embedding = _l2_normalize([result["embedding"]])[0].tolist()
         logger.debug("Embedding successful")
         return embedding
     
-    def embed_for_media_relevance(self, answer: str, media_captions: List[str]) -> List[float]:
+    async def aembed_query(self, text: str) -> List[float]:
+        logger.debug("Embedding single query text: %s...", text[:30])
+        result = await genai.embed_content_async(
+            model=self.model_name,
+            content=text,
+            task_type="retrieval_document"
+        )
+        return _l2_normalize([result["embedding"]])[0].tolist()
+
+    def embed_for_media_relevance(self, answer: str, media_captions: List[str]) -> np.ndarray:
         logger.info("Embedding answer and media captions for media relevance filtering")
         all_texts = [answer] + media_captions
         embeddings = self.embed_documents(all_texts)
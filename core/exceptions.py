@@ -1,5 +1,8 @@
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, status
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from schemas import BLANK_QUESTION_DETAIL
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import logging
@@ -47,4 +50,22 @@ async def global_exception_handler(request, exc):
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=APIError(detail="Internal server error").model_dump()
-    )
\ No newline at end of file
+    )
+
+def _is_blank_question(err: Dict[str, Any]) -> bool:
+    """A missing or null question, or the QueryRequest validator rejecting a blank one; not e.g. a number"""
+    if tuple(err.get("loc", ())) != ("body", "question"):
+        return False
+    if err.get("type") == "missing" or (err.get("type") == "string_type" and err.get("input") is None):
+        return True
+    return err.get("type") == "value_error" and str(err.get("ctx", {}).get("error")) == BLANK_QUESTION_DETAIL
+
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """A missing or blank question stays a 400 with a plain detail; other validation errors get FastAPI's 422"""
+    if any(_is_blank_question(err) for err in exc.errors()):
+        logger.warning("Query failed: Question is blank.")
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": BLANK_QUESTION_DETAIL}
+        )
+    return await request_validation_exception_handler(request, exc)
@@ -1,5 +1,5 @@
 import hashlib
 
-def compute_file_hash(file_bytes: bytes) -> str:
-    """Generate SHA256 hash for file content"""
-    return hashlib.sha256(file_bytes).hexdigest()
+def new_file_hasher():
+    """Create the incremental hasher used for file deduplication"""
+    return hashlib.sha256()
@@ -1,115 +1,155 @@
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict
 import google.generativeai as genai
+from cachetools import TTLCache
 from config import settings
 from schemas import DocumentChunk, QueryResponse
-from core.chroma import ChromaClient
-from core.embeddings import GeminiEmbeddings
+from core import get_chroma_client, get_embeddings
 from core.exceptions import RetrievalError, GenerationError
 from logger import get_logger
 
 logger = get_logger("MultimodalRetriever")
 
+# Static prompt parts are assembled once, without the source indentation the
+# inline f-strings used to send as extra tokens on every call
+CORRECTION_PROMPT = (
+    "You are an intelligent assistant that corrects typos and grammar in user questions.\n"
+    "Return the corrected version of this question:\n\n"
+    "Original: "
+)
+ANSWER_PROMPT_PREFIX = (
+    "You are a helpful assistant. Use the context below to answer the question.\n\n"
+    "Question: "
+)
+ANSWER_PROMPT_CONTEXT = "\n\nContext:\n"
+ANSWER_PROMPT_SUFFIX = (
+    "\n\nInstructions:\n"
+    "- If any tables are mentioned, output them in markdown format.\n"
+    "- Refer to any described images using [Image: description].\n"
+    "- Use [Page X] to refer to pages if helpful.\n"
+)
+
+# Normalized question -> corrected question, so a repeated question costs no
+# correction round trip even when its answer is no longer cached
+_correction_cache: "TTLCache[str, str]" = TTLCache(
+    maxsize=settings.QUERY_CACHE_SIZE,
+    ttl=settings.QUERY_CACHE_TTL
+)
+
 
 class MultimodalRetriever:
     def __init__(self, top_k: int = 5, top_docs: int = 3):
         logger.info("Initializing MultimodalRetriever")
-        self.db = ChromaClient()
-        self.embeddings = GeminiEmbeddings()
+        self.db = get_chroma_client()
+        self.embeddings = get_embeddings()
         self.generation_model = genai.GenerativeModel(settings.GEMINI_MODEL)
         self.top_k = top_k
         self.top_docs = top_docs
-        self.cache: Dict[Tuple[str, str], QueryResponse] = {}
 
     def _normalize_question(self, question: str) -> str:
         return question.strip().lower()
 
     async def correct_query(self, query: str) -> str:
-        prompt = f"""
-        You are an intelligent assistant that corrects typos and grammar in user questions.
-        Return the corrected version of this question:
+        if not any(ch.isalpha() for ch in query):
+            return query  # nothing to spell-check
+
+        key = self._normalize_question(query)
+        if key in _correction_cache:
+            return _correction_cache[key]
 
-        Original: {query}
-        """
         try:
-            response = self.generation_model.generate_content(prompt)
-            return response.text.strip()
+            response = await self.generation_model.generate_content_async(CORRECTION_PROMPT + query)
+            corrected = response.text.strip()
         except Exception as e:
-            logger.warning(f"Query correction failed, using original query: {e}")
+            logger.warning("Query correction failed, using original query: %s", e)
             return query
 
+        _correction_cache[key] = corrected
+        return corrected
+
     def _format_results(self, results: List[Dict]) -> List[DocumentChunk]:
         valid_chunks = []
+        seen = set()
         for doc in results:
             content = doc.get("document")
             metadata = doc.get("metadata", {})
             if isinstance(content, str) and content.strip():
+                # Identical text (e.g. the same file uploaded under another name)
+                # would only repeat itself in the prompt
+                if content in seen:
+                    logger.debug("Skipping duplicate chunk content: id=%s", doc.get("id"))
+                    continue
+                seen.add(content)
                 valid_chunks.append(
                     DocumentChunk(
                         content=content,
                         type="text",
                         page_number=metadata.get("page", -1),
+                        doc_id=metadata.get("doc_id"),
                         metadata=metadata
                     )
                 )
             else:
-                logger.warning(f"Skipping chunk with empty or invalid content: id={doc.get('id')}")
+                logger.warning("Skipping chunk with empty or invalid content: id=%s", doc.get("id"))
         return valid_chunks
 
 
-    def get_top_documents(self, query_embedding: List[float]) -> List[str]:
+    async def get_top_documents(self, query_embedding: List[float]) -> List[str]:
         logger.info("Running document-level retrieval")
-        results = self.db.query(
+        results = await self.db.async_query(
             query_embedding=query_embedding,
             n_results=self.top_docs
         )
 
-        doc_scores: Dict[str, float] = {}
-        for r in results:
-            doc_id = r["metadata"].get("doc_id")
-            score = r["score"]
-            if doc_id:
-                if doc_id not in doc_scores or score > doc_scores[doc_id]:
-                    doc_scores[doc_id] = score
-
-        top_doc_ids = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)
-        logger.info(f"Top matching documents: {[doc[0] for doc in top_doc_ids]}")
-        return [doc[0] for doc in top_doc_ids]
-
-    def get_top_chunks_from_documents(self, query_embedding: List[float], doc_ids: List[str]) -> List[DocumentChunk]:
-        logger.info(f"Retrieving top chunks from filtered documents: {doc_ids}")
-        all_chunks = []
-        for doc_id in doc_ids:
-            results = self.db.query(
-                query_embedding=query_embedding,
-                document_id=doc_id,
-                n_results=self.top_k
-            )
-            all_chunks.extend(results)
+        # Chroma returns hits best-first, so a document's first hit is its best
+        # score and first-seen order is already the ranking
+        top_doc_ids = list(dict.fromkeys(
+            doc_id for r in results if (doc_id := r["metadata"].get("doc_id"))
+        ))
+        logger.info("Top matching documents: %s", top_doc_ids)
+        return top_doc_ids
+
+    async def get_top_chunks_from_documents(self, query_embedding: List[float], doc_ids: List[str]) -> List[DocumentChunk]:
+        logger.info("Retrieving top chunks from filtered documents: %s", doc_ids)
+        if not doc_ids:
+            return []
+        # The global top_k over the union equals the top_k of per-document top_k lists,
+        # so a single $in query over all documents returns the same chunks
+        results = await self.db.async_query(
+            query_embedding=query_embedding,
+            document_ids=doc_ids,
+            n_results=self.top_k
+        )
 
-        sorted_chunks = sorted(all_chunks, key=lambda x: x["score"], reverse=True)
-        top_chunks = self._format_results(sorted_chunks[:self.top_k])
-        logger.info(f"Selected top {len(top_chunks)} chunks for generation")
+        # Already ordered best-first by Chroma
+        top_chunks = self._format_results(results[:self.top_k])
+        logger.info("Selected top %s chunks for generation", len(top_chunks))
         return top_chunks
 
-    async def retrieve(self, query: str, document_ids: Optional[List[str]] = None) -> List[DocumentChunk]:
-        logger.info(f"Retrieving relevant chunks for query: '{query}'")
+    async def retrieve(
+        self,
+        query: str,
+        document_ids: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[DocumentChunk]:
+        logger.info("Retrieving relevant chunks for query: '%s'", query)
         try:
-            query_embedding = self.embeddings.embed_query(query)
+            if query_embedding is None:
+                query_embedding = await self.embeddings.aembed_query(query)
             if document_ids:
-                logger.info(f"Using user-specified document_ids: {document_ids}")
+                logger.info("Using user-specified document_ids: %s", document_ids)
                 doc_ids = document_ids
             else:
-                doc_ids = self.get_top_documents(query_embedding)
+                doc_ids = await self.get_top_documents(query_embedding)
 
-            top_chunks = self.get_top_chunks_from_documents(query_embedding, doc_ids)
+            top_chunks = await self.get_top_chunks_from_documents(query_embedding, doc_ids)
             return top_chunks
 
         except Exception as e:
-            logger.error(f"Retrieval failed: {e}", exc_info=True)
+            logger.error("Retrieval failed: %s", e, exc_info=True)
             raise RetrievalError(f"Retrieval failed: {str(e)}")
 
     async def generate_response(self, query: str, chunks: List[DocumentChunk]) -> QueryResponse:
-        logger.info(f"Generating response from {len(chunks)} chunks")
+        logger.info("Generating response from %s chunks", len(chunks))
         if not chunks:
             raise GenerationError("No relevant context found to answer the question.")
 
@@ -117,26 +157,13 @@ class MultimodalRetriever:
             context_str = "\n\n".join([
                 f"[Page {chunk.page_number}]\n{chunk.content}" for chunk in chunks
             ])
+            prompt = "".join([ANSWER_PROMPT_PREFIX, query, ANSWER_PROMPT_CONTEXT, context_str, ANSWER_PROMPT_SUFFIX])
 
-            prompt = f"""
-            You are a helpful assistant. Use the context below to answer the question.
-
-            Question: {query}
-
-            Context:
-            {context_str}
-
-            Instructions:
-            - If any tables are mentioned, output them in markdown format.
-            - Refer to any described images using [Image: description].
-            - Use [Page X] to refer to pages if helpful.
-            """
-
-            response = self.generation_model.generate_content(prompt)
+            response = await self.generation_model.generate_content_async(prompt)
 
             sources = [
                 {
-                    "doc_id": chunk.metadata.get('doc_id', 'unknown'),
+                    "doc_id": chunk.doc_id or 'unknown',
                     "page": chunk.page_number,
                     "type": chunk.type
                 } for chunk in chunks
@@ -149,21 +176,25 @@ class MultimodalRetriever:
             )
 
         except Exception as e:
-            logger.error(f"Failed to generate answer: {e}", exc_info=True)
+            logger.error("Failed to generate answer: %s", e, exc_info=True)
             raise GenerationError(f"Response generation failed: {str(e)}")
 
-    async def end_to_end_query(self, query: str, document_ids: Optional[List[str]] = None) -> QueryResponse:
+    async def end_to_end_query(
+        self,
+        query: str,
+        document_ids: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> QueryResponse:
+        """
+        query_embedding, if given, is the embedding of query; it is reused for
+        retrieval when correction leaves the query unchanged.
+        """
         logger.info("End-to-end query started")
-        normalized_q = self._normalize_question(query)
-        cache_key = (",".join(document_ids) if document_ids else "ALL_DOCS", normalized_q)
-
-        if cache_key in self.cache:
-            logger.info("Using cached response")
-            return self.cache[cache_key]
-
         corrected_query = await self.correct_query(query)
-        chunks = await self.retrieve(corrected_query, document_ids=document_ids)
+        if corrected_query != query:
+            logger.info("Query corrected: %s → %s", query, corrected_query)
+            query_embedding = None
+        chunks = await self.retrieve(corrected_query, document_ids=document_ids, query_embedding=query_embedding)
         response = await self.generate_response(corrected_query, chunks)
-        self.cache[cache_key] = response
         logger.info("End-to-end query completed")
         return response
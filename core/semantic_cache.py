@@ -0,0 +1,132 @@
+import re
+import time
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional, NamedTuple, Tuple
+from schemas import QueryResponse
+from config import settings
+from logger import get_logger
+
+logger = get_logger("SemanticCache")
+
+# (document_ids, or None for all documents; top_k)
+Scope = Tuple[Optional[Tuple[str, ...]], int]
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+class _CacheEntry(NamedTuple):
+    scope: Scope
+    numbers: Tuple[str, ...]
+    slot: int  # row of the question's vector in SemanticCache._vectors
+    response: QueryResponse
+    created_at: float
+
+
+class SemanticCache:
+    """
+    In-process LRU cache of answered questions keyed by question embedding.
+    A lookup hits on the same normalized question in the same scope, or else
+    when a cached question in the same scope has cosine
+    similarity >= threshold, contains the same numbers (years, amounts,
+    section numbers) and has not expired.
+    Disabled by default with a Chroma server, where other API workers change
+    the store and invalidate() cannot reach their caches.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.SEMANTIC_CACHE_SIZE,
+        ttl_seconds: float = settings.SEMANTIC_CACHE_TTL,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        enabled: bool = not settings.CHROMA_HOST,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # One row per entry, allocated on the first put (once the embedding
+        # size is known) and reused through _free_slots, so a lookup is a
+        # single matrix-vector product with no per-query stacking
+        self._vectors: Optional[np.ndarray] = None
+        self._free_slots: List[int] = list(range(max_entries - 1, -1, -1))
+
+    @staticmethod
+    def scope_for(document_ids: Optional[List[str]], top_k: int) -> Scope:
+        return (tuple(document_ids) if document_ids else None, top_k)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    @staticmethod
+    def _numbers(question: str) -> Tuple[str, ...]:
+        # Embeddings barely separate "revenue in 2022" from "revenue in 2023"
+        return tuple(_NUMBER_RE.findall(question))
+
+    def _key(self, scope: Scope, question: str) -> str:
+        return hashlib.sha256(f"{scope}\x00{question.strip().lower()}".encode()).hexdigest()
+
+    def _remove(self, key: str):
+        self._free_slots.append(self._entries.pop(key).slot)
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e.created_at < cutoff]
+        for k in expired:
+            self._remove(k)
+
+    def get(self, scope: Scope, question: str, embedding: List[float]) -> Optional[QueryResponse]:
+        if not self.enabled:
+            return None
+        self._evict_expired()
+        exact_key = self._key(scope, question)
+        if exact_key in self._entries:
+            self._entries.move_to_end(exact_key)
+            logger.info("Semantic cache hit (exact question)")
+            return self._entries[exact_key].response
+
+        numbers = self._numbers(question)
+        candidates = [(k, e.slot) for k, e in self._entries.items() if e.scope == scope and e.numbers == numbers]
+        if not candidates:
+            return None
+
+        sims = self._vectors @ self._normalize(embedding)
+        key, slot = max(candidates, key=lambda c: sims[c[1]])
+        if sims[slot] < self.threshold:
+            logger.debug("Semantic cache miss (best similarity=%.3f)", sims[slot])
+            return None
+
+        self._entries.move_to_end(key)
+        logger.info("Semantic cache hit (similarity=%.3f)", sims[slot])
+        return self._entries[key].response
+
+    def put(self, scope: Scope, question: str, embedding: List[float], response: QueryResponse):
+        if not self.enabled or self.max_entries <= 0:
+            return
+        key = self._key(scope, question)
+        vec = self._normalize(embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+        if key in self._entries:
+            self._remove(key)
+        elif not self._free_slots:
+            self._remove(next(iter(self._entries)))  # least recently used
+        slot = self._free_slots.pop()
+        self._vectors[slot] = vec
+        self._entries[key] = _CacheEntry(scope, self._numbers(question), slot, response, time.monotonic())
+
+    def invalidate(self, document_id: str):
+        """Drop answers that could include document_id: all-documents scopes and scopes naming it"""
+        stale = [
+            k for k, e in self._entries.items()
+            if e.scope[0] is None or document_id in e.scope[0]
+        ]
+        for k in stale:
+            self._remove(k)
+        if stale:
+            logger.info("Invalidated %s semantic cache entries for document_id=%s", len(stale), document_id)
@@ -0,0 +1,8 @@
+from typing import Iterator
+
+MAX_CHUNK_LENGTH = 30000
+
+def split_text(text: str, max_len: int = MAX_CHUNK_LENGTH) -> Iterator[str]:
+    """Yield consecutive slices of text no longer than max_len characters"""
+    for start in range(0, len(text), max_len):
+        yield text[start:start + max_len]
@@ -1,18 +1,37 @@
 # logger.py
+import atexit
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# The format doesn't use thread/process fields, so skip collecting them per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
 
+# Request handlers only enqueue records; a background thread does the file and
+# console writes, so logging never blocks the event loop on disk I/O
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler("logs/app.log"),
+    logging.StreamHandler(),
+    respect_handler_level=True
+)
+
 logging.basicConfig(
-    level=logging.INFO,  # Change to DEBUG if you want more detailed logs
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),  # e.g. LOG_LEVEL=DEBUG for more detailed logs
+    # QueueHandler formats the record before enqueueing; the listener's handlers write it as-is
     format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/app.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 
+_listener.start()
+atexit.register(_listener.stop)
+
 def get_logger(name: str):
     return logging.getLogger(name)
@@ -1,59 +1,25 @@
-import logging
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from config import settings
-from core import initialize_services
-from core.exceptions import global_exception_handler
-from api import upload, query, delete
+"""
+Entry point: `python main.py`, or `uvicorn main:app`.
+The app lives in app.py and is imported only when main.app is first read.
+PDF page workers are spawned processes, which re-run this file as
+__mp_main__; with nothing imported at module level they load only what
+the worker itself needs, not Chroma, Gemini, FastAPI or a second log listener.
+"""
 
-# Setup logger
-logger = logging.getLogger("multimodal_api")
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    logger.info("Starting up Multimodal Document Assistant API...")
-    try:
-        initialize_services()
-        logger.info("Services initialized successfully.")
-        yield
-    finally:
-        logger.info("Cleaning up resources before shutdown.")
-
-
-app = FastAPI(
-    title="Multimodal Document Assistant API",
-    description="API for processing documents with text, tables and images",
-    version="1.0.0",
-    docs_url=None,  # Disable Swagger UI
-    redoc_url=None,  # Disable Redoc
-    lifespan=lifespan
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.add_exception_handler(Exception, global_exception_handler)
-
-app.include_router(upload.router, prefix="/v1")
-app.include_router(query.router, prefix="/v1")
-app.include_router(delete.router, prefix="/v1")
-
-
-@app.get("/health")
-async def health():
-    logger.info("Health check requested.")
-    return {"status": "ready", "services": ["chroma", "gemini"]}
+def __getattr__(name):
+    if name == "app":
+        from app import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
+    from config import settings
+    from logger import get_logger
 
-    logger.info(f"Running app on {settings.API_HOST}:{settings.API_PORT}")
+    get_logger("multimodal_api").info("Running app on %s:%s", settings.API_HOST, settings.API_PORT)
     uvicorn.run(
         "main:app",  # IMPORTANT: app as import string for reload support
         host=settings.API_HOST,
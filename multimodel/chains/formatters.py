@@ -5,6 +5,9 @@ from logger import get_logger
 
 logger = get_logger("MultimodalFormatter")
 
+TABLE_PATTERN = re.compile(r"```markdown\n(.*?)\n```", re.DOTALL)
+IMAGE_PATTERN = re.compile(r"\[Image:\s?(.*?)\]")
+
 class MultimodalFormatter:
     """Formats raw Gemini outputs into structured responses"""
 
@@ -12,8 +15,7 @@ class MultimodalFormatter:
     def extract_tables(text: str) -> Optional[Dict[str, Any]]:
         """Convert markdown tables to structured format"""
         logger.debug("Extracting tables from Gemini output.")
-        table_pattern = r"```markdown\n(.*?)\n```"
-        tables = re.findall(table_pattern, text, re.DOTALL)
+        tables = TABLE_PATTERN.findall(text)
 
         if not tables:
             logger.info("No tables found in Gemini output.")
@@ -30,8 +32,7 @@ class MultimodalFormatter:
     def extract_images(text: str) -> Optional[Dict[str, Any]]:
         """Detect image references in text"""
         logger.debug("Extracting image references from Gemini output.")
-        img_pattern = r'\[Image:\s?(.*?)\]'
-        images = re.findall(img_pattern, text)
+        images = IMAGE_PATTERN.findall(text)
 
         if not images:
             logger.info("No image references found in Gemini output.")
@@ -1,11 +1,10 @@
 from typing import List, Dict, Any
-from langchain.chains import LLMChain
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from schemas import DocumentChunk, QueryResponse
 from .formatters import MultimodalFormatter
 from core.exceptions import GenerationError
-from langchain.output_parsers import StrOutputParser
+from langchain_core.output_parsers import StrOutputParser
 from logger import get_logger
 
 logger = get_logger("MultimodalQAChain")
@@ -21,7 +20,8 @@ class MultimodalQAChain:
             convert_system_message_to_human=True
         )
         self.prompt = PromptTemplate.from_template(self._build_prompt_template())
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt, output_parser=StrOutputParser())
+        # Plain-text passthrough: the formatter parses the answer itself
+        self.chain = self.prompt | self.llm | StrOutputParser()
         logger.info("QA Chain ready.")
 
     def _build_prompt_template(self) -> str:
@@ -61,7 +61,7 @@ class MultimodalQAChain:
 
         try:
             context_str = self._format_context(chunks[:3])
-            result = await self.chain.arun({
+            result = await self.chain.ainvoke({
                 "question": question,
                 "context": context_str
             })
@@ -0,0 +1,47 @@
+"""
+pdfplumber text/table extraction by page range.
+Kept outside multimodel.processing and core so that spawned page workers,
+which import this module to run extract_page_range, load only pdfplumber
+rather than Chroma, Gemini, libmagic and the app's log listener.
+"""
+import io
+import logging
+from typing import List, Tuple, Union
+import pdfplumber
+from multimodel.tables import rows_to_markdown
+
+# Plain logging: in the API process this reaches the app's handlers; in a
+# worker, where nothing is configured, only warnings and errors are printed
+logger = logging.getLogger("PDFProcessor")
+
+
+def open_pdfplumber(data: Union[str, bytes]):
+    return pdfplumber.open(data if isinstance(data, str) else io.BytesIO(data))
+
+
+def extract_pages(pdf, start: int, stop: int) -> List[Tuple[str, str]]:
+    """(text, table_str) for pages [start, stop) of an open pdfplumber document"""
+    results = []
+    for i in range(start, stop):
+        page = pdf.pages[i]
+        page_num = i + 1
+        logger.debug(f"Processing page {page_num}")
+
+        # Extract text
+        text = page.extract_text() or ""
+        logger.debug(f"[PDF] Text length on page {page_num}: {len(text)}")
+
+        # Extract tables. The default "lines" strategy builds cells only from
+        # ruling lines and rect edges, so a page without any can't have a table
+        tables = page.extract_tables() if page.edges else []
+        logger.debug(f"[PDF] Page {page_num} has {len(tables)} tables.")
+        table_str = "".join(f"\n\nTable:\n{rows_to_markdown(table)}" for table in tables)
+
+        results.append((text, table_str))
+    return results
+
+
+def extract_page_range(data: Union[str, bytes], start: int, stop: int) -> List[Tuple[str, str]]:
+    """Worker entry point: open the PDF in this process and extract one page range"""
+    with open_pdfplumber(data) as pdf:
+        return extract_pages(pdf, start, stop)
@@ -1,40 +1,87 @@
 import magic
 import os
+import threading
+from typing import BinaryIO, Dict, Optional, Union
 from .docx import DocxProcessor
-from .pdf import PDFProcessor
+from .pdf import PDFProcessor, shutdown_page_pool
+
+Processor = Union[DocxProcessor, PDFProcessor]
+Source = Union[str, BinaryIO]
+
+_PROCESSOR_CLASSES = {
+    ".docx": DocxProcessor,
+    ".pdf": PDFProcessor,
+}
+
+_MIME_TO_EXT = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/pdf": ".pdf",
+}
+
+# magic.from_buffer builds a new libmagic handle per call; reuse one instead
+_magic = magic.Magic(mime=True)
+_magic_lock = threading.Lock()
 
 class ProcessorFactory:
+    # Processors are stateless between calls, so one instance per type is reused
+    _cache: Dict[str, Processor] = {}
+
+    @classmethod
+    def _get_or_build(cls, ext: str) -> Processor:
+        processor = cls._cache.get(ext)
+        if processor is None:
+            processor = cls._cache[ext] = _PROCESSOR_CLASSES[ext]()
+        return processor
+
+    @classmethod
+    def warm_up(cls):
+        """Build every processor up front so the first upload doesn't pay for it"""
+        for ext in _PROCESSOR_CLASSES:
+            cls._get_or_build(ext)
+
     @staticmethod
-    def get_processor(file_path: str):
+    def shutdown():
+        """Stop the PDF page worker processes, if any were started"""
+        shutdown_page_pool()
+
+    @staticmethod
+    def _read_head(source: Source) -> bytes:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                return f.read(2048)
+        source.seek(0)
+        head = source.read(2048)
+        source.seek(0)
+        return head
+
+    @staticmethod
+    def _detect_mime(source: Source) -> str:
+        head = ProcessorFactory._read_head(source)
+        with _magic_lock:  # a libmagic handle must not be used from two threads at once
+            return _magic.from_buffer(head)
+
+    @classmethod
+    def get_processor(cls, source: Source, ext: Optional[str] = None) -> Processor:
+        """
+        Pick a processor for a file path or a seekable binary file object.
+        For file objects, pass the original extension as ext.
+        A supported extension is trusted; content sniffing is only needed without one.
+        """
+        if ext is None:
+            ext = os.path.splitext(source)[1].lower() if isinstance(source, str) else ""
+        if ext in _PROCESSOR_CLASSES:
+            return cls._get_or_build(ext)
+
         try:
-            with open(file_path, 'rb') as f:
-                initial_bytes = f.read(2048)
-            file_type = magic.from_buffer(initial_bytes, mime=True)
+            file_type = cls._detect_mime(source)
         except Exception:
-            # fallback to extension if magic fails
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext == ".docx":
-                return DocxProcessor(file_path)
-            elif ext == ".pdf":
-                return PDFProcessor(file_path)
-            else:
-                raise ValueError(f"Unsupported file extension: {ext}")
-
-        if file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            return DocxProcessor(file_path)
-        elif file_type == "application/pdf":
-            return PDFProcessor(file_path)
-        else:
-            # fallback to extension if MIME not matched
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext == ".docx":
-                return DocxProcessor(file_path)
-            elif ext == ".pdf":
-                return PDFProcessor(file_path)
-            else:
-                raise ValueError(f"Unsupported file type or extension: {file_type}, {ext}")
+            raise ValueError(f"Unsupported file extension: {ext}")
+
+        if file_type in _MIME_TO_EXT:
+            return cls._get_or_build(_MIME_TO_EXT[file_type])
+        raise ValueError(f"Unsupported file type or extension: {file_type}, {ext}")
 
     @staticmethod
-    def process(file_path: str):
-        processor = ProcessorFactory.get_processor(file_path)
-        return processor.process()
+    def process(source: Source, ext: Optional[str] = None):
+        processor = ProcessorFactory.get_processor(source, ext)
+        return processor.process(source)
@@ -1,90 +1,193 @@
-import docx
-from PIL import Image
 import io
-import pandas as pd
-import os
 import zipfile
-import xml.etree.ElementTree as ET
-from typing import List, Dict, Union
+from lxml import etree as ET
+from PIL import Image
+from typing import BinaryIO, Iterator, List, Union
+from config import settings
 from core.captioner import GeminiMultimodalProcessor
+from multimodel.tables import rows_to_markdown
 from schemas import DocumentChunk
 from logger import get_logger
 
 logger = get_logger("DocxProcessor")
 
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+A_BLIP = '{http://schemas.openxmlformats.org/drawingml/2006/main}blip'
+R_EMBED = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed'
+RELS_NS = {'pr': 'http://schemas.openxmlformats.org/package/2006/relationships'}
+
+MAX_TEXT_LENGTH = 5_000_000  # characters of extracted text kept per document
+
+# Run-level elements that contribute text, matching python-docx's paragraph.text
+_RUN_BREAKS = {W_NS + 'tab': '\t', W_NS + 'br': '\n', W_NS + 'cr': '\n'}
+# Elements whose runs are part of the paragraph's text. Nothing else is walked:
+# not properties (w:pPr tab stops, w:rPr), deleted runs (w:del), or text boxes
+# and drawings inside a run
+_RUN_CONTAINERS = {
+    W_NS + tag for tag in ('hyperlink', 'ins', 'smartTag', 'sdt', 'sdtContent', 'fldSimple')
+}
+
+
+def _collect_run_text(el: ET._Element, parts: List[str]):
+    for child in el:
+        if child.tag == W_NS + 'r':
+            for item in child:
+                if item.tag == W_NS + 't':
+                    parts.append(item.text or '')
+                elif item.tag in _RUN_BREAKS:
+                    parts.append(_RUN_BREAKS[item.tag])
+        elif child.tag in _RUN_CONTAINERS:
+            _collect_run_text(child, parts)
+
+
+def _paragraph_text(p: ET._Element) -> str:
+    parts: List[str] = []
+    _collect_run_text(p, parts)
+    return ''.join(parts)
+
+
+def _grid_span(tc: ET._Element) -> int:
+    span = tc.find(f'{W_NS}tcPr/{W_NS}gridSpan')
+    try:
+        return max(1, int(span.get(W_NS + 'val'))) if span is not None else 1
+    except (TypeError, ValueError):
+        return 1
+
+
+def _table_rows(tbl: ET._Element) -> List[List[str]]:
+    """Cell text per row; a horizontally merged cell is repeated once per grid column, like python-docx's row.cells"""
+    rows = []
+    for tr in tbl.findall(W_NS + 'tr'):
+        row = []
+        for tc in tr.findall(W_NS + 'tc'):
+            text = '\n'.join(_paragraph_text(p) for p in tc.findall(W_NS + 'p'))
+            row.extend([text] * _grid_span(tc))
+        rows.append(row)
+    return rows
+
+
+def _too_small(image_bytes: bytes) -> bool:
+    """Whether an image is below the caption size threshold; reads only the header"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            width, height = img.size
+    except Exception:
+        return False  # unknown format (e.g. EMF/WMF); leave it to the captioner
+    return width * height < settings.MIN_CAPTION_IMAGE_AREA
+
+
+def _release(elem: ET._Element):
+    """Free a consumed element and the already-consumed siblings before it"""
+    elem.clear()
+    parent = elem.getparent()
+    while elem.getprevious() is not None:
+        del parent[0]
+
+
 class DocxProcessor:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
-        self.document = docx.Document(file_path)
+    def __init__(self):
         self.captioner = GeminiMultimodalProcessor()
 
-    def process(self) -> List[DocumentChunk]:
-        logger.info(f"Processing DOCX file: {self.file_path}")
+    def process(self, source: Union[str, BinaryIO]) -> List[DocumentChunk]:
+        """Extract a unified text chunk from a DOCX path or seekable binary file object."""
+        logger.info(f"Processing DOCX file: {source if isinstance(source, str) else '<stream>'}")
         chunks = []
 
-        text_parts = []
+        paragraphs: List[str] = []
+        tables: List[List[List[str]]] = []
+        images: List[bytes] = []
 
-        # Extract paragraphs
-        for para in self.document.paragraphs:
-            if para.text.strip():
-                text_parts.append(para.text.strip())
-
-        # Extract tables
-        for i, table in enumerate(self.document.tables):
+        with zipfile.ZipFile(source) as z:
             try:
-                data = [[cell.text for cell in row.cells] for row in table.rows]
-                df = pd.DataFrame(data[1:], columns=data[0]) if data else pd.DataFrame()
-                markdown = df.to_markdown(index=False)
-                logger.debug(f"Extracted table {i+1} with shape {df.shape}")
-                text_parts.append(f"\nTable:\n{markdown}")
-            except Exception as e:
-                logger.warning(f"Failed to process table {i+1}: {e}")
-
-        # Extract images from zip structure
-        try:
-            with zipfile.ZipFile(self.file_path) as z:
-                with z.open('word/document.xml') as f:
-                    tree = ET.parse(f)
-                    root = tree.getroot()
-                    ns = {
-                        'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
-                        'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-                        'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+                with z.open('word/_rels/document.xml.rels') as rels_file:
+                    rels = {
+                        rel.attrib['Id']: rel.attrib['Target']
+                        for rel in ET.parse(rels_file).getroot().findall('pr:Relationship', RELS_NS)
                     }
-                    blips = root.findall('.//a:blip', ns)
+            except KeyError:
+                rels = {}  # no relationships part, so no embedded images
 
-                with z.open('word/_rels/document.xml.rels') as rels_file:
-                    rels_tree = ET.parse(rels_file)
-                    rels_root = rels_tree.getroot()
-                    nsmap = {'pr': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-                    rels = {rel.attrib['Id']: rel.attrib['Target'] for rel in rels_root.findall('pr:Relationship', nsmap)}
-
-                for i, elem in enumerate(blips):
-                    r_id = elem.attrib.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-                    if not r_id or r_id not in rels:
+            # One streaming pass over the body. Like python-docx's document.paragraphs
+            # and document.tables, only direct children of w:body are collected;
+            # each is cleared once read so memory stays bounded on large documents
+            fallback_depth = 0
+            blip_ids = []
+            with z.open('word/document.xml') as f:
+                for event, elem in ET.iterparse(f, events=('start', 'end')):
+                    if elem.tag == MC_FALLBACK:
+                        fallback_depth += 1 if event == 'start' else -1
+                        continue
+                    if event == 'start':
                         continue
-                    image_path = f'word/{rels[r_id]}'
-                    with z.open(image_path) as img_file:
-                        img_data = img_file.read()
-                        try:
-                            caption_obj = self.captioner.process(img_data, 'image')
-                            caption = getattr(caption_obj, 'caption', '')
-                            logger.debug(f"Caption for image {i+1}: {caption}")
-                            text_parts.append(f"\nImage: {caption}")
-                        except Exception as e:
-                            logger.warning(f"Failed to process image {i+1}: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to extract images from DOCX: {e}")
-
-        combined = "\n\n".join(text_parts)
-        if combined.strip():
-            chunks.append(DocumentChunk(
-                content=combined.strip(),
+                    if elem.tag == A_BLIP:
+                        if not fallback_depth:  # the fallback repeats the image
+                            blip_ids.append(elem.attrib.get(R_EMBED))
+                        continue
+
+                    parent = elem.getparent()
+                    if parent is None or parent.tag != W_NS + 'body':
+                        continue
+                    if elem.tag == W_NS + 'p':
+                        text = _paragraph_text(elem).strip()
+                        if text:
+                            paragraphs.append(text)
+                    elif elem.tag == W_NS + 'tbl':
+                        tables.append(_table_rows(elem))
+                    _release(elem)
+
+            # Read image bytes while the archive is open; captioning runs after
+            for r_id in blip_ids:
+                if not r_id or r_id not in rels:
+                    continue
+                try:
+                    image = z.read(f'word/{rels[r_id]}')
+                except KeyError as e:
+                    logger.warning("Missing image part in DOCX: %s", e)
+                    continue
+                if _too_small(image):
+                    logger.debug("Skipping image %s below %s pixels", rels[r_id], settings.MIN_CAPTION_IMAGE_AREA)
+                    continue
+                images.append(image)
+
+        # Written incrementally and capped, so a pathological document can't
+        # build an unbounded string (or pay for captions that would be cut off)
+        buf = io.StringIO()
+        size = 0
+        for part in self._iter_sections(paragraphs, tables, images):
+            if size + len(part) > MAX_TEXT_LENGTH:
+                logger.warning("DOCX text exceeds %s characters; truncating", MAX_TEXT_LENGTH)
+                break
+            if size:
+                buf.write("\n\n")
+                size += 2
+            buf.write(part)
+            size += len(part)
+
+        combined = buf.getvalue().strip()
+        if combined:
+            chunks.append(DocumentChunk.model_construct(
+                content=combined,
                 type="text",
                 page_number=None
             ))
-            logger.info(f"Created 1 unified chunk with length {len(combined.strip())}")
+            logger.info(f"Created 1 unified chunk with length {len(combined)}")
         else:
             logger.warning("No content extracted from DOCX file.")
 
-        return chunks
\ No newline at end of file
+        return chunks
+
+    def _iter_sections(self, paragraphs: List[str], tables: List[List[List[str]]], images: List[bytes]) -> Iterator[str]:
+        """Yield paragraphs, then tables, then image captions; captioning only starts once reached"""
+        yield from paragraphs
+
+        for i, rows in enumerate(tables):
+            markdown = rows_to_markdown(rows)
+            logger.debug(f"Extracted table {i+1} with {len(rows)} rows")
+            yield f"\nTable:\n{markdown}"
+
+        for i, caption in enumerate(self.captioner.process_many(images, 'image')):
+            if caption is None:
+                continue
+            logger.debug(f"Caption for image {i+1}: {caption}")
+            yield f"\nImage: {caption}"
@@ -1,72 +1,159 @@
-from typing import List
-import PyPDF2
-import pdfplumber
-import pandas as pd
-from PIL import Image
-import io
-import pytesseract
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import settings
 from core.captioner import GeminiMultimodalProcessor
+from multimodel.pdf_pages import extract_page_range, extract_pages, open_pdfplumber
 from schemas import DocumentChunk
 from logger import get_logger
 
 logger = get_logger("PDFProcessor")
 
+# Below this many pages, handing work to other processes costs more than it saves
+PARALLEL_MIN_PAGES = 8
+
+# pdfplumber text/table extraction is CPU-bound pure Python, so large PDFs are
+# split into page ranges across processes. Spawned (not forked) because the
+# parent has live Chroma/gRPC threads; a spawned worker re-runs the launcher
+# script, which is why main.py imports the app lazily.
+_page_pool: Union[ProcessPoolExecutor, None] = None
+_page_pool_lock = threading.Lock()  # uploads run processors on several threads
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
+
+def shutdown_page_pool():
+    """Stop the page worker processes, if any were started; called at app shutdown"""
+    global _page_pool
+    with _page_pool_lock:
+        pool, _page_pool = _page_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_page_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next large PDF starts a fresh one"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False)
+
+
 class PDFProcessor:
-    def __init__(self, file_path: str):
-        self.file_path = file_path
+    def __init__(self):
         self.captioner = GeminiMultimodalProcessor()
-        self.doc = fitz.open(self.file_path)
 
-    def process(self) -> List[DocumentChunk]:
-        logger.info(f"Processing PDF file: {self.file_path}")
+    @staticmethod
+    @contextlib.contextmanager
+    def _source_path(source: Union[str, BinaryIO]) -> Iterator[str]:
+        """
+        A path is used as-is; a stream is copied to a temporary file, so the
+        PDF is never held whole in memory and page workers are sent only its path.
+        """
+        if isinstance(source, str):
+            yield source
+            return
+        source.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(source, tmp)
+        source.seek(0)
+        try:
+            yield tmp.name
+        finally:
+            os.unlink(tmp.name)
+
+    def _extract_text_and_tables(self, path: str, num_pages: int) -> List[Tuple[str, str]]:
+        workers = min(settings.PDF_PARSE_WORKERS, num_pages)
+        if num_pages < PARALLEL_MIN_PAGES or workers < 2:
+            with open_pdfplumber(path) as pdf:
+                return extract_pages(pdf, 0, num_pages)
+
+        step = -(-num_pages // workers)  # ceil division
+        starts = range(0, num_pages, step)
+        logger.info("[PDF] Extracting %s pages across %s processes", num_pages, len(starts))
+        pool = _get_page_pool()
+        try:
+            futures = [
+                pool.submit(extract_page_range, path, start, min(start + step, num_pages))
+                for start in starts
+            ]
+            return [page for future in futures for page in future.result()]
+        except BrokenProcessPool as e:
+            # A worker died (OOM, crash in the parser); the pool refuses all
+            # further work, so replace it and parse this document in-process
+            logger.warning("[PDF] Page worker pool broke (%s); extracting in-process", e)
+            _discard_page_pool(pool)
+            with open_pdfplumber(path) as pdf:
+                return extract_pages(pdf, 0, num_pages)
+
+    def process(self, source: Union[str, BinaryIO]) -> List[DocumentChunk]:
+        """Extract one chunk per page from a PDF path or seekable binary file object."""
+        logger.info(f"Processing PDF file: {source if isinstance(source, str) else '<stream>'}")
         chunks = []
 
-        with pdfplumber.open(self.file_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_num = i + 1
-                logger.debug(f"Processing page {page_num}")
-
-                # Extract text
-                text = page.extract_text() or ""
-                logger.debug(f"[PDF] Text length on page {page_num}: {len(text)}")
-
-                # Extract tables
-                tables = page.extract_tables()
-                logger.debug(f"[PDF] Page {page_num} has {len(tables)} tables.")
-                table_str = ""
-                for table in tables:
-                    try:
-                        df = pd.DataFrame(table[1:], columns=table[0])
-                        table_str += f"\n\nTable:\n{df.to_markdown()}"
-                    except Exception as e:
-                        logger.warning(f"Failed to parse table on page {page_num}: {e}")
-
-                # Extract images
-                images = self.doc[i].get_images(full=True)
-                logger.debug(f"[PDF] Page {page_num} has {len(images)} images.")
-                image_str = ""
-                for img_index, img in enumerate(images):
-                    try:
-                        xref = img[0]
-                        base_image = self.doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        caption_obj = self.captioner.process(image_bytes, 'image')
-                        caption = getattr(caption_obj, 'caption', '')
-                        image_str += f"\n\nImage: {caption}"
-                    except Exception as e:
-                        logger.warning(f"Failed to extract image on page {page_num}: {e}")
-
-                combined = text.strip() + table_str + image_str
-                if combined.strip():
-                    chunks.append(DocumentChunk(
-                        content=combined.strip(),
-                        type="text",
-                        page_number=page_num
-                    ))
-                    logger.info(f"[PDF] Created chunk for page {page_num}, length: {len(combined.strip())}")
-                else:
-                    logger.warning(f"[PDF] No content extracted from page {page_num}")
+        with self._source_path(source) as path, fitz.open(path) as doc:
+            num_pages = doc.page_count
+            pages = self._extract_text_and_tables(path, num_pages)
+
+            # Logos and backgrounds are usually one xref shared by many pages;
+            # each image object is extracted (and captioned) once
+            page_xrefs: List[List[int]] = []
+            for i in range(num_pages):
+                images = doc[i].get_images(full=True)
+                logger.debug(f"[PDF] Page {i + 1} has {len(images)} images.")
+                page_xrefs.append(list(dict.fromkeys(img[0] for img in images)))
+
+            image_bytes: Dict[int, bytes] = {}    # xref -> encoded image, captioned together below
+            skipped = 0
+            for xref in dict.fromkeys(xref for xrefs in page_xrefs for xref in xrefs):
+                try:
+                    base_image = doc.extract_image(xref)
+                except Exception as e:
+                    logger.warning("Failed to extract image xref %s: %s", xref, e)
+                    continue
+                # Decorative icons and rule lines aren't worth a caption round trip
+                if base_image["width"] * base_image["height"] < settings.MIN_CAPTION_IMAGE_AREA:
+                    skipped += 1
+                    continue
+                image_bytes[xref] = base_image["image"]
+            if skipped:
+                logger.debug("[PDF] Skipped %s images below %s pixels", skipped, settings.MIN_CAPTION_IMAGE_AREA)
+
+        # Caption every image concurrently instead of one round trip at a time
+        captions = dict(zip(image_bytes, self.captioner.process_many(list(image_bytes.values()), 'image')))
+        image_parts = [
+            [f"\n\nImage: {captions[xref]}" for xref in xrefs if captions.get(xref) is not None]
+            for xrefs in page_xrefs
+        ]
+
+        for i, ((text, table_str), parts) in enumerate(zip(pages, image_parts)):
+            page_num = i + 1
+            combined = "".join([text.strip(), table_str, *parts])
+            if combined.strip():
+                chunks.append(DocumentChunk.model_construct(
+                    content=combined.strip(),
+                    type="text",
+                    page_number=page_num
+                ))
+                logger.info(f"[PDF] Created chunk for page {page_num}, length: {len(combined.strip())}")
+            else:
+                logger.warning(f"[PDF] No content extracted from page {page_num}")
 
         logger.info(f"Extracted {len(chunks)} unified chunks from PDF")
         return chunks
@@ -0,0 +1,22 @@
+"""
+Markdown rendering for extracted tables.
+Standard library only, so spawned PDF page workers can import it cheaply.
+"""
+from typing import Any, List, Sequence
+
+def _table_cell(value: Any) -> str:
+    return "" if value is None else str(value).replace("\n", " ").strip()
+
+def rows_to_markdown(rows: Sequence[Sequence[Any]]) -> str:
+    """Render rows as a markdown pipe table, using the first row as the header"""
+    width = max((len(row) for row in rows), default=0)
+    if not width:
+        return ""
+    cells = [[_table_cell(c) for c in row] + [""] * (width - len(row)) for row in rows]
+    widths = [max(3, *(len(row[i]) for row in cells)) for i in range(width)]
+
+    def fmt(row: List[str]) -> str:
+        return "| " + " | ".join(c.ljust(w) for c, w in zip(row, widths)) + " |"
+
+    separator = "|" + "|".join("-" * (w + 2) for w in widths) + "|"
+    return "\n".join([fmt(cells[0]), separator, *map(fmt, cells[1:])])
@@ -1,15 +1,19 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Literal, Optional, List, Dict, Union
 from datetime import datetime
 
-class DocumentMetadata(BaseModel):  
+class DocumentMetadata(BaseModel):
     source: str
-    created_at: datetime = datetime.now()
+    created_at: datetime = Field(default_factory=datetime.now)  # per instance, not import time
     file_type: Literal["pdf", "docx"]
     pages: Optional[int] = None
 
 
 class DocumentChunk(BaseModel):
+    # Chunks are never modified after extraction; processors build them with
+    # model_construct since every field is already known-valid there
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     content: str                                     # Pure combined text: paragraph + table (as text) + image (as caption text)
     type: Literal["text"]                            # Everything is embedded as text now
     page_number: Optional[int] = None
@@ -36,9 +40,19 @@ class UploadResponse(BaseModel):
     metadata: DocumentMetadata
 
 
+BLANK_QUESTION_DETAIL = "Please enter a non-empty question."
+
 class QueryRequest(BaseModel):
     document_ids: Optional[List[str]] = None
-    question: Optional[str] = None
+    question: str
+
+    @field_validator("question")
+    @classmethod
+    def _question_not_blank(cls, v: str) -> str:
+        # isspace() avoids allocating a stripped copy just to test emptiness
+        if not v or v.isspace():
+            raise ValueError(BLANK_QUESTION_DETAIL)
+        return v
 
 
 class QueryResponse(BaseModel):
@@ -0,0 +1,6 @@
+import os
+
+
+def pytest_configure(config):
+    # config.Settings requires a Gemini key at import time; no test calls Gemini
+    os.environ.setdefault("GEMINI_API_KEY", "test")
@@ -0,0 +1,57 @@
+import io
+import zipfile
+
+import pytest
+from lxml import etree as ET
+from multimodel.processing.docx import W_NS, _paragraph_text, _table_rows
+
+DOCUMENT_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body>
+    <w:p>
+      <w:pPr><w:tabs><w:tab w:val="left" w:pos="2000"/><w:tab w:val="left" w:pos="4000"/></w:tabs></w:pPr>
+      <w:r><w:rPr><w:b/></w:rPr><w:t>Name</w:t></w:r>
+      <w:r><w:tab/><w:t>Value</w:t></w:r>
+    </w:p>
+    <w:p>
+      <w:r><w:t xml:space="preserve">Kept </w:t></w:r>
+      <w:del w:id="1" w:author="a"><w:r><w:tab/><w:delText>gone</w:delText><w:br/></w:r></w:del>
+      <w:ins w:id="2" w:author="a"><w:r><w:t>added</w:t></w:r></w:ins>
+      <w:hyperlink><w:r><w:t> link</w:t></w:r></w:hyperlink>
+    </w:p>
+    <w:tbl>
+      <w:tr>
+        <w:tc>
+          <w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="1000"/></w:tabs></w:pPr><w:r><w:t>A</w:t></w:r></w:p>
+          <w:p><w:r><w:t>B</w:t></w:r></w:p>
+        </w:tc>
+        <w:tc><w:tcPr><w:gridSpan w:val="2"/></w:tcPr><w:p><w:r><w:t>C</w:t></w:r></w:p></w:tc>
+      </w:tr>
+    </w:tbl>
+  </w:body>
+</w:document>
+"""
+
+
+@pytest.fixture
+def body():
+    """Body of a minimal .docx written to an in-memory archive and read back"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("word/document.xml", DOCUMENT_XML)
+    with zipfile.ZipFile(buf) as z, z.open("word/document.xml") as f:
+        return ET.parse(f).getroot().find(W_NS + "body")
+
+
+def test_paragraph_text_ignores_tab_stop_definitions(body):
+    paragraphs = body.findall(W_NS + "p")
+    assert _paragraph_text(paragraphs[0]) == "Name\tValue"
+
+
+def test_paragraph_text_skips_deleted_runs(body):
+    paragraphs = body.findall(W_NS + "p")
+    assert _paragraph_text(paragraphs[1]) == "Kept added link"
+
+
+def test_table_rows_join_cell_paragraphs_and_repeat_merged_cells(body):
+    assert _table_rows(body.find(W_NS + "tbl")) == [["A\nB", "C", "C"]]
@@ -0,0 +1,81 @@
+import pytest
+
+from core.semantic_cache import SemanticCache
+from schemas import QueryResponse
+
+ALL_DOCS = SemanticCache.scope_for(None, 5)
+
+
+def _answer(text: str) -> QueryResponse:
+    return QueryResponse(answer=text, sources=[])
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(max_entries=8, ttl_seconds=60, threshold=0.97, enabled=True)
+
+
+def test_similar_question_in_same_scope_hits(cache):
+    cache.put(ALL_DOCS, "What is the refund policy?", [1.0, 0.0, 0.0], _answer("30 days"))
+    hit = cache.get(ALL_DOCS, "Explain the refund policy", [0.99, 0.05, 0.0])
+    assert hit is not None and hit.answer == "30 days"
+
+
+def test_question_below_threshold_misses(cache):
+    cache.put(ALL_DOCS, "What is the refund policy?", [1.0, 0.0, 0.0], _answer("30 days"))
+    assert cache.get(ALL_DOCS, "Who signed the contract?", [0.9, 0.43, 0.0]) is None
+
+
+def test_exact_question_hits_without_similarity(cache):
+    cache.put(ALL_DOCS, "What is the refund policy?", [1.0, 0.0, 0.0], _answer("30 days"))
+    hit = cache.get(ALL_DOCS, "  what is the REFUND policy?", [0.0, 1.0, 0.0])
+    assert hit is not None and hit.answer == "30 days"
+
+
+def test_different_numbers_miss_even_with_identical_embedding(cache):
+    cache.put(ALL_DOCS, "Revenue in 2022?", [1.0, 0.0, 0.0], _answer("$1M"))
+    assert cache.get(ALL_DOCS, "Revenue in 2023?", [1.0, 0.0, 0.0]) is None
+    assert cache.get(ALL_DOCS, "What was revenue in 2022?", [1.0, 0.0, 0.0]).answer == "$1M"
+
+
+def test_scope_is_part_of_the_match(cache):
+    cache.put(SemanticCache.scope_for(["a.pdf_1234"], 5), "Summary?", [1.0, 0.0, 0.0], _answer("a"))
+    assert cache.get(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0]) is None
+    assert cache.get(SemanticCache.scope_for(["a.pdf_1234"], 3), "Summary?", [1.0, 0.0, 0.0]) is None
+
+
+def test_invalidate_drops_all_documents_and_naming_scopes(cache):
+    named = SemanticCache.scope_for(["a.pdf_1234"], 5)
+    other = SemanticCache.scope_for(["b.pdf_5678"], 5)
+    for scope in (ALL_DOCS, named, other):
+        cache.put(scope, "Summary?", [1.0, 0.0, 0.0], _answer(str(scope)))
+
+    cache.invalidate("a.pdf_1234")
+
+    assert cache.get(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0]) is None
+    assert cache.get(named, "Summary?", [1.0, 0.0, 0.0]) is None
+    assert cache.get(other, "Summary?", [1.0, 0.0, 0.0]).answer == str(other)
+
+
+def test_least_recently_used_entry_is_evicted_and_its_slot_reused():
+    cache = SemanticCache(max_entries=2, ttl_seconds=60, threshold=0.97, enabled=True)
+    cache.put(ALL_DOCS, "first", [1.0, 0.0, 0.0], _answer("first"))
+    cache.put(ALL_DOCS, "second", [0.0, 1.0, 0.0], _answer("second"))
+    cache.get(ALL_DOCS, "first", [1.0, 0.0, 0.0])  # now most recently used
+    cache.put(ALL_DOCS, "third", [0.0, 0.0, 1.0], _answer("third"))
+
+    assert cache.get(ALL_DOCS, "second again", [0.0, 1.0, 0.0]) is None
+    assert cache.get(ALL_DOCS, "first again", [1.0, 0.0, 0.0]).answer == "first"
+    assert cache.get(ALL_DOCS, "third again", [0.0, 0.0, 1.0]).answer == "third"
+
+
+def test_expired_entries_miss():
+    cache = SemanticCache(max_entries=8, ttl_seconds=-1, threshold=0.97, enabled=True)
+    cache.put(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0], _answer("a"))
+    assert cache.get(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0]) is None
+
+
+def test_disabled_cache_never_hits():
+    cache = SemanticCache(enabled=False)
+    cache.put(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0], _answer("a"))
+    assert cache.get(ALL_DOCS, "Summary?", [1.0, 0.0, 0.0]) is None
@@ -0,0 +1,23 @@
+from multimodel.tables import rows_to_markdown
+
+
+def test_first_row_is_the_header():
+    assert rows_to_markdown([["Name", "Qty"], ["Apple", "3"]]) == (
+        "| Name  | Qty |\n"
+        "|-------|-----|\n"
+        "| Apple | 3   |"
+    )
+
+
+def test_short_rows_are_padded_and_cells_cleaned():
+    assert rows_to_markdown([["A", "B"], [None], ["two\nlines", " x "]]) == (
+        "| A         | B   |\n"
+        "|-----------|-----|\n"
+        "|           |     |\n"
+        "| two lines | x   |"
+    )
+
+
+def test_empty_table_renders_nothing():
+    assert rows_to_markdown([]) == ""
+    assert rows_to_markdown([[]]) == ""
@@ -0,0 +1,10 @@
+from core.text_utils import split_text
+
+
+def test_split_text_yields_bounded_consecutive_slices():
+    assert list(split_text("abcdefg", max_len=3)) == ["abc", "def", "g"]
+
+
+def test_split_text_keeps_short_and_empty_text_whole():
+    assert list(split_text("abc", max_len=3)) == ["abc"]
+    assert list(split_text("", max_len=3)) == []
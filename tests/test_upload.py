@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import io
+import time
+
+import pytest
+from fastapi import UploadFile
+
+from api import upload
+from schemas import DocumentChunk
+
+
+class FakeChroma:
+    def __init__(self, stored_hashes=()):
+        self.stored_hashes = set(stored_hashes)
+        self.added = []
+
+    async def async_existing_file_hashes(self, file_hashes):
+        return {h for h in file_hashes if h in self.stored_hashes}
+
+    async def async_add(self, chunks, document_id, file_hash=None):
+        self.added.append(document_id)
+
+
+class FakeSemanticCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, document_id):
+        self.invalidated.append(document_id)
+
+
+class FakeProcessor:
+    """One chunk holding the file's text; files starting with "slow" take longer"""
+
+    def process(self, buffer):
+        text = buffer.read().decode()
+        if text.startswith("slow"):
+            time.sleep(0.05)
+        return [DocumentChunk.model_construct(content=text, type="text", page_number=1)]
+
+
+@pytest.fixture
+def chroma(monkeypatch):
+    fake = FakeChroma()
+    monkeypatch.setattr(upload, "get_chroma_client", lambda: fake)
+    monkeypatch.setattr(upload, "get_semantic_cache", FakeSemanticCache)
+    monkeypatch.setattr(upload.ProcessorFactory, "get_processor", lambda buffer, ext: FakeProcessor())
+    return fake
+
+
+def _file(name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name)
+
+
+def _document_id(name: str, content: bytes) -> str:
+    return name + "_" + hashlib.sha256(content).hexdigest()[:8]
+
+
+def _upload(*files):
+    return asyncio.run(upload.upload_multiple_files(list(files)))["results"]
+
+
+def test_results_follow_upload_order(chroma):
+    results = _upload(
+        _file("slow.pdf", b"slow document"),
+        _file("notes.txt", b"unsupported"),
+        _file("fast.docx", b"fast document"),
+    )
+
+    assert [r["status"] for r in results] == ["success", "error", "success"]
+    assert results[0]["document_id"] == _document_id("slow.pdf", b"slow document")
+    assert results[1]["filename"] == "notes.txt"
+    assert results[2]["document_id"] == _document_id("fast.docx", b"fast document")
+
+
+def test_repeated_file_in_one_batch_is_stored_once(chroma):
+    results = _upload(
+        _file("a.pdf", b"same bytes"),
+        _file("copy of a.pdf", b"same bytes"),
+    )
+
+    assert [r["status"] for r in results] == ["success", "duplicate"]
+    assert results[1]["document_id"] == _document_id("copy_of_a.pdf", b"same bytes")
+    assert chroma.added == [_document_id("a.pdf", b"same bytes")]
+
+
+def test_already_stored_file_is_a_duplicate(chroma):
+    chroma.stored_hashes.add(hashlib.sha256(b"stored").hexdigest())
+
+    results = _upload(_file("old.pdf", b"stored"), _file("new.pdf", b"new"))
+
+    assert [r["status"] for r in results] == ["duplicate", "success"]
+    assert chroma.added == [_document_id("new.pdf", b"new")]